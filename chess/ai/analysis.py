@@ -0,0 +1,181 @@
+"""
+Batch position analysis with an on-disk result cache.
+
+Positions are given as FEN strings. Results are cached in SQLite keyed by the position's
+Zobrist hash and halfmove clock (the search scores the fifty-move rule) and the depth searched,
+and a deeper result answers any shallower request. The cache records the search's table
+fingerprint and empties itself when it changes, so results from an older search or evaluation
+(a search version bump, a newly tuned tuned_tables.py) are never served.
+"""
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from ai import mini_max
+from ai.mini_max import search, search_lines, table_fingerprint
+from utils import pos_to_square
+
+DEFAULT_CACHE_PATH = "analysis_cache.db"
+
+
+def move_to_string(move) -> str:
+    """
+    Formats a board move in long algebraic notation (e.g., "e2e4").
+    """
+    return pos_to_square(move[0]) + pos_to_square(move[1])
+
+
+def position_key(board, color) -> str:
+    """
+    Returns the cache key of a position: its Zobrist hash and halfmove clock.
+    """
+    return f"{board.get_hash(color=color):016x}/{board.halfmove_clock}"
+
+
+class AnalysisCache:
+    """
+    SQLite store of search results, keeping only the deepest result for each position.
+
+    Attributes:
+        connection (sqlite3.Connection): The open database connection.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH) -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS analysis (
+                hash TEXT PRIMARY KEY,
+                depth INTEGER NOT NULL,
+                score REAL NOT NULL,
+                best_move TEXT,
+                pv TEXT NOT NULL
+            )"""
+        )
+        self.connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        fingerprint = f"{table_fingerprint():016x}"
+        row = self.connection.execute("SELECT value FROM metadata WHERE name = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint: # Scored by another search or evaluation
+            self.connection.execute("DELETE FROM analysis")
+            self.connection.execute("INSERT OR REPLACE INTO metadata (name, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        self.connection.commit()
+
+    def get(self, key, depth) -> dict or None:
+        """
+        Returns the cached result for a position key (from position_key) if it was searched to at least the given depth.
+        """
+        row = self.connection.execute(
+            "SELECT depth, score, best_move, pv FROM analysis WHERE hash = ? AND depth >= ?", (key, depth)
+        ).fetchone()
+        if row is None:
+            return None
+        return {"depth": row[0], "score": row[1], "best_move": row[2], "pv": row[3].split(), "cached": True}
+
+    def put(self, results) -> None:
+        """
+        Stores (key, result) pairs, replacing a cached result only with a deeper one.
+        """
+        self.connection.executemany(
+            """INSERT INTO analysis (hash, depth, score, best_move, pv) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(hash) DO UPDATE SET depth = excluded.depth, score = excluded.score,
+               best_move = excluded.best_move, pv = excluded.pv WHERE excluded.depth > analysis.depth""",
+            [(key, result["depth"], result["score"], result["best_move"], " ".join(result["pv"]))
+             for key, result in results]
+        )
+        self.connection.commit()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def analyze_position(fen, depth=None, time_limit=None) -> dict:
+    """
+    Searches a single position. Runs in the worker processes of analyze_batch.
+
+    Args:
+        fen (str): The position in Forsyth-Edwards Notation.
+        depth (int): The search depth in plies.
+        time_limit (float): Seconds to search for.
+
+    Returns:
+        dict: The score (positive favours white), best move, principal variation and depth reached.
+    """
+    board = Board()
+    color = board.load_fen(fen)
+    # Table entries ignore the halfmove clock, so start cold and let the result depend only on the FEN, like its cache key
+    mini_max.transposition_table.clear()
+    score, best_move, pv, reached_depth = search(board, depth=depth, color=color, time_limit=time_limit)
+    return {
+        "depth": reached_depth,
+        "score": float(score),
+        "best_move": move_to_string(best_move) if best_move else None,
+        "pv": [move_to_string(move) for move in pv],
+        "cached": False
+    }
+
+
+def analyze_lines(fen, lines=3, depth=None, time_limit=None) -> list:
+    """
+    Ranks the best few moves of a position in one multi-line search.
+
+    Args:
+        fen (str): The position in Forsyth-Edwards Notation.
+        lines (int): The number of moves to rank.
+        depth (int): The search depth in plies.
+        time_limit (float): Seconds to search for.
+
+    Returns:
+        list: One dict per move, best first, with score, move, pv and depth.
+    """
+    board = Board()
+    color = board.load_fen(fen)
+    ranked, reached_depth = search_lines(board, lines=lines, depth=depth, color=color, time_limit=time_limit)
+    return [
+        {"depth": reached_depth, "score": float(score), "move": move_to_string(move),
+         "pv": [move_to_string(pv_move) for pv_move in pv]}
+        for score, move, pv in ranked
+    ]
+
+
+def analyze_batch(positions, depth=None, time_limit=None, workers=None, cache_path=DEFAULT_CACHE_PATH) -> list:
+    """
+    Analyzes many positions on a pool of worker processes, answering from the cache where possible.
+
+    Args:
+        positions (list): FEN strings of the positions to analyze.
+        depth (int): The search depth in plies. Required for cache lookups.
+        time_limit (float): Seconds to search each position for. Results are still cached by the depth reached.
+        workers (int): The number of worker processes. Defaults to the CPU count.
+        cache_path (str): The SQLite cache file, or None to disable caching.
+
+    Returns:
+        list: One result dict per position, in order, with score, best_move, pv, depth and cached.
+    """
+    if depth is None and time_limit is None:
+        raise ValueError("analyze_batch needs a depth or a time limit.")
+
+    cache = AnalysisCache(cache_path) if cache_path else None
+    keys, results, pending = [], {}, {}
+    try:
+        for fen in positions:
+            board = Board()
+            key = position_key(board, board.load_fen(fen))
+            keys.append(key)
+            if key in results or key in pending:
+                continue # Searched once per batch
+            if cache and depth is not None and (cached := cache.get(key, depth)):
+                results[key] = cached
+            else:
+                pending[key] = fen
+
+        if pending:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {key: executor.submit(analyze_position, fen, depth, time_limit) for key, fen in pending.items()}
+                for key, future in futures.items():
+                    results[key] = future.result()
+            if cache:
+                cache.put([(key, results[key]) for key in pending])
+    finally:
+        if cache:
+            cache.close()
+
+    return [dict(results[key]) for key in keys]
@@ -0,0 +1,246 @@
+"""
+Mate solver built on depth-first proof-number search (df-pn).
+
+The attacker only plays checks and the defender answers with every legal evasion, so the tree is far
+narrower than a full-width search. Each node keeps a proof number (how many leaves must still be shown
+to be mates) and a disproof number (how many must be shown to escape), and the search always expands
+the most promising node, backing off when its thresholds are exceeded. Results are kept in a bounded
+table, keyed by position and the plies left, so a proof within the move limit is exact.
+
+Castling and en passant are not generated, neither as checks nor as evasions.
+"""
+import copy
+from collections import OrderedDict
+
+from piece import Pawn, Queen, King
+
+INFINITY = 10 ** 9
+
+
+class NodeBudgetExceeded(Exception):
+    """
+    Raised inside the solver when it runs past its node limit.
+    """
+
+
+class ProofTable:
+    """
+    Bounded LRU table of (proof number, disproof number, plies to mate) per node.
+
+    Attributes:
+        capacity (int): The maximum number of nodes kept.
+    """
+
+    def __init__(self, capacity=1_000_000) -> None:
+        self.capacity = capacity
+        self.entries = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key) -> tuple:
+        """
+        Returns the stored numbers of a node, or (1, 1, 0) for a node not searched yet.
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            return 1, 1, 0
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, proof, disproof, distance) -> None:
+        self.entries[key] = (proof, disproof, distance)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+def play(board, move) -> object:
+    """
+    Returns a copy of the board with the move played. Only the moved piece is copied,
+    since the solver never changes pieces in place. Pawns promote to a queen.
+    """
+    (row, col), (new_row, new_col) = move
+    child = board.copy()
+    piece = copy.copy(board[row][col])
+    piece.pos, piece.has_moved = (new_row, new_col), True
+    if isinstance(piece, Pawn) and new_row in (0, 7):
+        piece = Queen(piece.color, (new_row, new_col))
+    child[row][col], child[new_row][new_col] = None, piece
+    return child
+
+
+def king_square(board, piece_color) -> tuple or None:
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if isinstance(piece, King) and piece.color == piece_color:
+                return (row, col)
+    return None
+
+
+class MateSolver:
+    """
+    Proves or disproves a forced mate for one side within a number of moves.
+
+    Attributes:
+        board_obj (Board): Supplies move generation, attack detection and hashing.
+        table (ProofTable): The node table, shared between solves.
+        node_limit (int): Nodes a solve may expand before giving up.
+        nodes (int): Nodes expanded by the last solve.
+    """
+
+    def __init__(self, board_obj, node_limit=200_000, table_size=1_000_000) -> None:
+        self.board_obj = board_obj
+        self.table = ProofTable(table_size)
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.attacker = 1
+
+    def is_in_check(self, board, color) -> bool:
+        piece_color = 1 if color == 1 else -1
+        king_pos = king_square(board, piece_color)
+        return king_pos is None or self.board_obj.is_square_attacked(king_pos, -piece_color, board)
+
+    def children(self, board, color) -> list:
+        """
+        Returns the (move, board) pairs searched from a node: the legal checks for the attacker,
+        and every legal move for the defender.
+        """
+        children = []
+        for move in dict.fromkeys(self.board_obj.get_moves(color=color, copy_board=board)):
+            child = play(board, move)
+            if self.is_in_check(child, color):
+                continue
+            if color == self.attacker and not self.is_in_check(child, 1 - color):
+                continue
+            children.append((move, child))
+        return children
+
+    def solve(self, board, color, max_moves) -> tuple:
+        """
+        Searches for a mate by color in at most max_moves moves.
+
+        Args:
+            board (np.ndarray): The position to solve.
+            color (int): The attacking color, to move (1 for white, 0 for black).
+            max_moves (int): The longest mate looked for, in the attacker's moves.
+
+        Returns:
+            tuple: True and the mating line if there is a forced mate, False and an empty line if
+            there is provably none within max_moves, or None and an empty line if the node limit ran out.
+        """
+        self.attacker, self.nodes = color, 0
+        plies = 2 * max_moves - 1
+        try:
+            proof, disproof = self.mid(board, color, plies, INFINITY, INFINITY)
+        except NodeBudgetExceeded:
+            return None, []
+        if proof == 0:
+            return True, self.line(board, color, plies)
+        return False, []
+
+    def key(self, board, color, plies) -> tuple:
+        return self.board_obj.get_hash(board, color), plies
+
+    def collect(self, children, color, plies) -> tuple:
+        """
+        Combines the children's numbers into the node's, and picks the child to expand next.
+
+        Returns:
+            tuple: The proof and disproof numbers, plies to mate, the index of the best child
+            and the runner-up's number (proof for the attacker, disproof for the defender).
+        """
+        entries = [self.table.get(self.key(child, 1 - color, plies - 1)) for _, child in children]
+        if color == self.attacker: # OR node: one mating move is enough
+            ranked = sorted(range(len(entries)), key=lambda index: entries[index][0])
+            proof = entries[ranked[0]][0]
+            disproof = min(sum(entry[1] for entry in entries), INFINITY)
+            distance = 1 + min((entry[2] for entry in entries if entry[0] == 0), default=0)
+            second = entries[ranked[1]][0] if len(ranked) > 1 else INFINITY
+        else: # AND node: every evasion must be mated
+            ranked = sorted(range(len(entries)), key=lambda index: entries[index][1])
+            proof = min(sum(entry[0] for entry in entries), INFINITY)
+            disproof = entries[ranked[0]][1]
+            distance = 1 + max(entry[2] for entry in entries)
+            second = entries[ranked[1]][1] if len(ranked) > 1 else INFINITY
+        return proof, disproof, distance, ranked[0], second
+
+    def mid(self, board, color, plies, proof_threshold, disproof_threshold) -> tuple:
+        """
+        Expands a node until its proof or disproof number reaches its threshold.
+
+        Returns:
+            tuple: The node's proof and disproof numbers.
+        """
+        self.nodes += 1
+        if self.nodes > self.node_limit:
+            raise NodeBudgetExceeded()
+        key = self.key(board, color, plies)
+        children = self.children(board, color) if plies >= 0 else []
+
+        if color != self.attacker and (not children or plies == 0):
+            # The defender is always in check here: no evasion is mate, and running out of plies is an escape
+            proof, disproof = (0, INFINITY) if not children else (INFINITY, 0)
+            self.table.put(key, proof, disproof, 0)
+            return proof, disproof
+        if not children: # No checks left
+            self.table.put(key, INFINITY, 0, 0)
+            return INFINITY, 0
+
+        while True:
+            proof, disproof, distance, best, second = self.collect(children, color, plies)
+            if proof >= proof_threshold or disproof >= disproof_threshold:
+                break
+            child_proof, child_disproof, _ = self.table.get(self.key(children[best][1], 1 - color, plies - 1))
+            if color == self.attacker:
+                child_thresholds = (min(proof_threshold, second + 1), disproof_threshold - disproof + child_disproof)
+            else:
+                child_thresholds = (proof_threshold - proof + child_proof, min(disproof_threshold, second + 1))
+            self.mid(children[best][1], 1 - color, plies - 1, *child_thresholds)
+
+        self.table.put(key, proof, disproof, distance)
+        return proof, disproof
+
+    def line(self, board, color, plies) -> list:
+        """
+        Follows a proof from the table: the attacker's quickest mate against the defender's longest resistance.
+        """
+        line = []
+        while plies >= 0:
+            children = self.children(board, color)
+            entries = [(self.table.get(self.key(child, 1 - color, plies - 1)), move, child) for move, child in children]
+            if color == self.attacker:
+                proven = [item for item in entries if item[0][0] == 0]
+                if not proven:
+                    break # Evicted from the table
+                _, move, board = min(proven, key=lambda item: item[0][2])
+            else:
+                if not entries:
+                    break # Mate
+                _, move, board = max(entries, key=lambda item: item[0][2])
+            line.append(move)
+            color, plies = 1 - color, plies - 1
+        return line
+
+
+def find_mate(board_obj, color=1, max_moves=5, node_limit=200_000) -> tuple:
+    """
+    Looks for a forced mate in the current position of a Board.
+
+    Args:
+        board_obj (Board): The board to solve.
+        color (int): The color to move, which is the attacker (1 for white, 0 for black).
+        max_moves (int): The longest mate looked for, in the attacker's moves.
+        node_limit (int): Nodes to expand before giving up.
+
+    Returns:
+        tuple: True, False or None (mate, no mate within max_moves, out of nodes), the mating line
+        as ((row, col), (new_row, new_col)) moves, and the nodes expanded.
+    """
+    solver = MateSolver(board_obj, node_limit)
+    found, line = solver.solve(board_obj.board, color, max_moves)
+    return found, line, solver.nodes
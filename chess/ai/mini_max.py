@@ -1,57 +1,428 @@
+import time
+import zlib
 import numpy as np
-import random
-from piece import Knight, Bishop, Rook, Queen, King, Pawn
+from board import Board, FEN_PIECES
+from piece import King, Pawn, PIECE_VALUES
+from ai.transposition import TranspositionTable, EXACT, LOWER, UPPER
 
-def minimax(board_obj, board, depth, alpha, beta, simulating_player=bool):
-    if board_obj.is_checkmate():
-        return -1000 if simulating_player else 1000
-    
-    elif depth == 0:
-        return evaluate(board)
+try: # Values and tables written by tune.py replace the hand-picked ones when present
+    from tuned_tables import PIECE_VALUES as EVALUATION_VALUES, squareTables
+except ImportError:
+    from ai.piece_square_tables import squareTables
+    EVALUATION_VALUES = PIECE_VALUES
 
+MATE_SCORE = 1000
+DRAW_SCORE = 0
+MAX_DEPTH = 64
+SEARCH_VERSION = 4 # Bump whenever stored scores change meaning, so older table snapshots are rejected
+
+PST_SCALE = 0.1 # Piece-square table entries are in tenths of a pawn
+SQUARE_TABLES = squareTables
+
+
+def square_values(piece_values, tables) -> dict:
+    """
+    Combines piece values and piece-square tables into the value of each piece id on each board square,
+    positive for white. Tables are valued for white with the eighth rank first and files a to h; black
+    reads them flipped, and board columns are mirrored (king on column 3).
+    """
+    values = {}
+    for piece_id, piece_type in FEN_PIECES.items():
+        table = tables[piece_type]
+        values[piece_id] = [[piece_values[piece_type] + PST_SCALE * table[7 - row][7 - col] for col in range(8)] for row in range(8)]
+        values[piece_id.lower()] = [[-piece_values[piece_type] - PST_SCALE * table[row][7 - col] for col in range(8)] for row in range(8)]
+    return values
+
+
+SQUARE_VALUES = square_values(EVALUATION_VALUES, SQUARE_TABLES)
+EVALUATION_CHECKSUM = zlib.crc32(repr(sorted(SQUARE_VALUES.items())).encode())
+
+transposition_table = TranspositionTable()
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside minimax when a search runs past its deadline or node limit.
+    """
+
+
+class SearchStats:
+    """
+    Counts the nodes of the current search and holds its node limit.
+    """
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.node_limit = None
+
+
+search_stats = SearchStats()
+killer_moves = [[None, None] for _ in range(MAX_DEPTH + 1)] # Per ply, the last two quiet moves that caused a cutoff
+
+
+def count_node(deadline) -> None:
+    """
+    Counts a searched node, raising SearchTimeout past the deadline or node limit.
+    """
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+    search_stats.nodes += 1
+    if search_stats.node_limit is not None and search_stats.nodes > search_stats.node_limit:
+        raise SearchTimeout()
+
+
+def is_pseudo_legal(board, move, color) -> bool:
+    """
+    Checks if a move (e.g., a hash or killer move from another position) can be played in this one.
+    Only the moving piece's moves are generated.
+    """
+    piece = board[move[0][0]][move[0][1]]
+    return piece is not None and piece.color == (1 if color == 1 else -1) and move in piece.get_all_moves(board)
+
+
+def staged_moves(board_obj, board, color, hash_move=None, killers=(), position_hash=None):
+    """
+    Yields the moves of a position in stages, generating each stage only when the search reaches it:
+    the hash move, captures that don't lose material (best exchange first), killer moves, the other
+    quiet moves, and losing captures last. A cutoff early on skips generating the quiet moves at all.
+
+    Args:
+        board_obj (Board): The board the moves are searched on.
+        board (np.ndarray): The position the moves are played from.
+        color (int): The color to move (1 for white, 0 for black).
+        hash_move (tuple): The transposition table's best move for the position, if any.
+        killers (list): Quiet moves that caused cutoffs at the same ply.
+        position_hash (int): The position's get_hash, for the move cache.
+    """
+    if hash_move is not None and is_pseudo_legal(board, hash_move, color):
+        yield hash_move
+
+    # Revisited positions already have their full move list cached, and picking captures from it is cheaper.
+    # Peeking leaves the hit or miss to be counted once, by get_moves in the quiet stage.
+    cached = board_obj.move_cache.peek(position_hash, color) if position_hash is not None else None
+    if cached is not None:
+        all_captures = {move for move in cached if board[move[1][0]][move[1][1]] is not None}
+    else:
+        all_captures = set(board_obj.get_captures(color, board))
+    captures, losing = [], []
+    for move in all_captures:
+        if move != hash_move:
+            exchange = board_obj.static_exchange(move, board)
+            (captures if exchange >= 0 else losing).append((exchange, move))
+    captures.sort(key=lambda capture: -capture[0])
+    for _, move in captures:
+        yield move
+
+    tried = {hash_move}
+    for move in killers:
+        if move is not None and move not in tried and board[move[1][0]][move[1][1]] is None \
+                and is_pseudo_legal(board, move, color):
+            tried.add(move)
+            yield move
+
+    for move in set(board_obj.get_moves(color=color, copy_board=board, position_hash=position_hash)):
+        if move not in tried and board[move[1][0]][move[1][1]] is None:
+            yield move
+
+    losing.sort(key=lambda capture: -capture[0])
+    for _, move in losing:
+        yield move
+
+
+def store_killer(board, move, ply) -> None:
+    """
+    Remembers a quiet move that caused a cutoff, to try early in sibling positions.
+    """
+    killers = killer_moves[ply]
+    if board[move[1][0]][move[1][1]] is None and killers[0] != move:
+        killers[1], killers[0] = killers[0], move
+
+
+def quiescence(board_obj, board, alpha, beta, simulating_player=bool, deadline=None):
+    """
+    Searches captures until the position is quiet, so the evaluation isn't taken in the middle of an exchange.
+    Captures that lose material by static exchange are pruned.
+    """
+    count_node(deadline)
+
+    kings = [piece.color for row in board for piece in row if isinstance(piece, King)]
+    if len(kings) < 2:
+        return MATE_SCORE * (1 if 1 in kings else -1)
+
+    # The side to move may stand pat instead of capturing
+    best_eval = evaluate(board)
     if simulating_player:
-        max_eval = -np.inf
-        for move in set(board_obj.get_moves(color=0)): # Black
-            #print('PLAYER MOVE', move)
-            c_board = board_obj.simulate_move(move)
-            eval = minimax(board_obj, c_board, depth-1, alpha, beta, simulating_player=False)
-            max_eval = max(max_eval, eval)
+        if best_eval <= alpha:
+            return best_eval
+        beta = min(beta, best_eval)
+    else:
+        if best_eval >= beta:
+            return best_eval
+        alpha = max(alpha, best_eval)
+
+    color = 0 if simulating_player else 1
+    captures = []
+    for move in set(board_obj.get_captures(color, board)):
+        exchange = board_obj.static_exchange(move, board)
+        if exchange >= 0:
+            captures.append((exchange, move))
+    captures.sort(key=lambda capture: -capture[0])
+
+    for _, move in captures:
+        eval = quiescence(board_obj, board_obj.simulate_move(move, board), alpha, beta,
+                          simulating_player=not simulating_player, deadline=deadline)
+        if simulating_player:
+            best_eval = min(best_eval, eval)
+            beta = min(beta, eval)
+        else:
+            best_eval = max(best_eval, eval)
             alpha = max(alpha, eval)
+        if beta <= alpha:
+            break
+    return best_eval
+
+
+def minimax(board_obj, board, depth, alpha, beta, simulating_player=bool, pv=None, deadline=None, ply=0):
+    if depth == 0:
+        return quiescence(board_obj, board, alpha, beta, simulating_player=simulating_player, deadline=deadline)
+    count_node(deadline)
+
+    # The search is pseudo-legal, so a lost game shows up as a captured king
+    kings = [piece.color for row in board for piece in row if isinstance(piece, King)]
+    if len(kings) < 2:
+        return (MATE_SCORE + depth) * (1 if 1 in kings else -1)
+
+    # A repeated position or fifty quiet moves is a draw; cut the cycle short
+    color = 0 if simulating_player else 1
+    key = board_obj.get_hash(board, color)
+    if ply > 0 and (board_obj.halfmove_clock >= 100 or board_obj.is_repetition(key)):
+        if pv is not None:
+            pv.clear()
+        return DRAW_SCORE
+
+    # Use a stored result if it was searched at least as deep and its bound settles this window
+    entry = transposition_table.get(key)
+    hash_move = None
+    if entry is not None:
+        entry_depth, score, flag, hash_move = entry
+        if entry_depth >= depth and (flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha)):
+            if pv is not None:
+                pv[:] = [hash_move] if hash_move else []
+            return score
+
+    # Try the stored best move first, it is the most likely to cause a cutoff, then good captures
+    moves = staged_moves(board_obj, board, color, hash_move, tuple(killer_moves[ply]), key)
+    alpha_original, beta_original, best_move = alpha, beta, None
+    clock = board_obj.halfmove_clock
+    board_obj.history.append(key)
+
+    if simulating_player:
+        min_eval = np.inf
+        for move in moves: # Black
+            c_board = board_obj.simulate_move(move, board)
+            line = [] if pv is not None else None
+            board_obj.halfmove_clock = 0 if is_irreversible(board, move) else clock + 1
+            eval = minimax(board_obj, c_board, depth-1, alpha, beta, simulating_player=False, pv=line, deadline=deadline, ply=ply+1)
+            if eval < min_eval:
+                min_eval, best_move = eval, move
+                if pv is not None:
+                    pv[:] = [move] + line
+            beta = min(beta, eval)
 
             if beta <= alpha:
+                store_killer(board, move, ply)
                 break
-        return max_eval
+        best_eval = min_eval
     else:
-        min_eval = np.inf
-        for move in set(board_obj.get_moves(color=1)): # White
-            #print('AI MOVE', move, 'COLOR: ')
-            c_board = board_obj.simulate_move(move)
-            eval = minimax(board_obj, c_board, depth-1, alpha, beta, simulating_player=True)
-            min_eval = min(min_eval, eval)
-            beta = min(beta, eval)
+        max_eval = -np.inf
+        for move in moves: # White
+            c_board = board_obj.simulate_move(move, board)
+            line = [] if pv is not None else None
+            board_obj.halfmove_clock = 0 if is_irreversible(board, move) else clock + 1
+            eval = minimax(board_obj, c_board, depth-1, alpha, beta, simulating_player=True, pv=line, deadline=deadline, ply=ply+1)
+            if eval > max_eval:
+                max_eval, best_move = eval, move
+                if pv is not None:
+                    pv[:] = [move] + line
+            alpha = max(alpha, eval)
 
             if beta <= alpha:
+                store_killer(board, move, ply)
                 break
-        return min_eval
-    
+        best_eval = max_eval
+
+    board_obj.history.pop()
+    board_obj.halfmove_clock = clock
+    flag = UPPER if best_eval <= alpha_original else LOWER if best_eval >= beta_original else EXACT
+    transposition_table.put(key, depth, best_eval, flag, best_move)
+    return best_eval
+
+
+def is_irreversible(board, move) -> bool:
+    """
+    Checks if a move is a capture or pawn move, which resets the halfmove clock.
+    """
+    (row, col), (new_row, new_col) = move
+    return isinstance(board[row][col], Pawn) or board[new_row][new_col] is not None
+
+
+def table_fingerprint() -> int:
+    """
+    Identifies the position hashing, the search version and the evaluation tables, so snapshots saved
+    with different Zobrist keys or by a search that scored positions differently are rejected.
+    """
+    return (Board().get_hash() ^ SEARCH_VERSION * 0x9E3779B97F4A7C15 ^ EVALUATION_CHECKSUM << 32) & 0xFFFFFFFFFFFFFFFF
+
+
+def load_table(path) -> bool:
+    """
+    Warm-starts the transposition table from a snapshot file.
+    """
+    return transposition_table.load(path, table_fingerprint())
+
+
+def save_table(path) -> int:
+    """
+    Saves the transposition table to a snapshot file.
+    """
+    return transposition_table.save(path, table_fingerprint())
+
+
+def search(board_obj, depth=None, color=1, time_limit=None, node_limit=None, on_depth=None):
+    """
+    Searches the current position of a Board, deepening one ply at a time.
+
+    Args:
+        board_obj (Board): The board to search.
+        depth (int): The search depth in plies. With a time or node limit, the maximum depth to deepen to.
+        color (int): The color to move (1 for white, 0 for black).
+        time_limit (float): Seconds to search for. Defaults to no limit.
+        node_limit (int): Nodes to search. Defaults to no limit.
+        on_depth (callable): Called with (depth, score, best move, pv) after each completed depth.
+
+    Returns:
+        tuple: The score (positive favours white), the best move, the principal variation and the completed depth.
+    """
+    depth = depth or MAX_DEPTH
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    result = (evaluate(board_obj.board), None, [], 0)
+
+    history_length, clock = len(board_obj.history), board_obj.halfmove_clock
+    search_stats.nodes = 0
+    for killers in killer_moves:
+        killers[:] = [None, None]
+
+    for current_depth in range(1, depth + 1):
+        pv = []
+        # Depth 1 always completes, so a limited search still returns a move
+        search_stats.node_limit = node_limit if current_depth > 1 else None
+        try:
+            score = minimax(board_obj, board_obj.board, current_depth, -np.inf, np.inf,
+                            simulating_player=color == 0, pv=pv, deadline=deadline if current_depth > 1 else None)
+        except SearchTimeout:
+            # Unwind the positions the interrupted search pushed
+            del board_obj.history[history_length:]
+            board_obj.halfmove_clock = clock
+            break
+        best_move = pv[0] if pv else None
+        result = (score, best_move, pv, current_depth)
+        if on_depth:
+            on_depth(current_depth, score, best_move, pv)
+    search_stats.node_limit = None
+    return result
+
+
+def search_root(board_obj, color, depth, moves, deadline=None) -> tuple:
+    """
+    Searches the given root moves of the current position with a full window.
+
+    Args:
+        board_obj (Board): The board to search.
+        color (int): The color to move (1 for white, 0 for black).
+        depth (int): The search depth in plies.
+        moves (list): The root moves to consider, best first.
+        deadline (float): The perf_counter time to stop at, if any.
+
+    Returns:
+        tuple: The exact score of the best of the moves and its principal variation.
+    """
+    simulating_player = color == 0
+    alpha, beta = -np.inf, np.inf
+    best_eval, best_pv = None, []
+    history_length, clock = len(board_obj.history), board_obj.halfmove_clock
+    board_obj.history.append(board_obj.get_hash(color=color))
+    try:
+        for move in moves:
+            line = []
+            board_obj.halfmove_clock = 0 if is_irreversible(board_obj.board, move) else clock + 1
+            eval = minimax(board_obj, board_obj.simulate_move(move), depth - 1, alpha, beta,
+                           simulating_player=not simulating_player, pv=line, deadline=deadline, ply=1)
+            if best_eval is None or (eval < best_eval if simulating_player else eval > best_eval):
+                best_eval, best_pv = eval, [move] + line
+            if simulating_player:
+                beta = min(beta, eval)
+            else:
+                alpha = max(alpha, eval)
+    finally:
+        # Also unwinds the positions an interrupted minimax pushed
+        del board_obj.history[history_length:]
+        board_obj.halfmove_clock = clock
+    return best_eval, best_pv
+
+
+def search_lines(board_obj, lines=3, depth=None, color=1, time_limit=None, node_limit=None, on_depth=None):
+    """
+    Searches the current position for its best few moves, each with an exact score and principal variation.
+    At every depth the best move is found first, then the best of the rest, and so on; the passes share the
+    transposition table, so the later ones mostly revisit subtrees the earlier ones already searched.
+
+    Args:
+        board_obj (Board): The board to search.
+        lines (int): The number of moves to rank.
+        depth (int): The search depth in plies. With a time or node limit, the maximum depth to deepen to.
+        color (int): The color to move (1 for white, 0 for black).
+        time_limit (float): Seconds to search for. Defaults to no limit.
+        node_limit (int): Nodes to search. Defaults to no limit.
+        on_depth (callable): Called with (depth, lines) after each completed depth.
+
+    Returns:
+        tuple: A list of (score, move, pv) tuples, best first, and the completed depth.
+    """
+    depth = depth or MAX_DEPTH
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    moves = list(staged_moves(board_obj, board_obj.board, color))
+    result, completed_depth = [], 0
+    search_stats.nodes = 0
+    for killers in killer_moves:
+        killers[:] = [None, None]
+
+    for current_depth in range(1, depth + 1):
+        found, remaining = [], list(moves)
+        # Depth 1 always completes, so a limited search still returns its lines
+        search_stats.node_limit = node_limit if current_depth > 1 else None
+        try:
+            while remaining and len(found) < lines:
+                score, pv = search_root(board_obj, color, current_depth, remaining,
+                                        deadline=deadline if current_depth > 1 else None)
+                found.append((score, pv[0], pv))
+                remaining.remove(pv[0])
+        except SearchTimeout:
+            break
+        result, completed_depth = found, current_depth
+        # The next depth tries this depth's ranking first
+        moves = [move for _, move, _ in found] + remaining
+        if on_depth:
+            on_depth(current_depth, result)
+    search_stats.node_limit = None
+    return result, completed_depth
+
+
 def evaluate(board):
-    value = { # Value of each piece
-        Pawn: 1,
-        Knight: 3,
-        Bishop: 3,
-        Rook: 5,
-        Queen: 9,
-        King: 100
-    }
-
-    white_score, black_score = 0, 0
-    
-    for row in board:
-        for piece in row:
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
             if piece:
-                if piece.color:
-                    white_score += value[type(piece)]
-                else:
-                    black_score += value[type(piece)]
-    
-    return white_score - black_score # White is positive, black is negativ
\ No newline at end of file
+                score += SQUARE_VALUES[piece.id][row][col] # Material plus placement, negative for black
+
+    return score # White is positive, black is negative
@@ -1,4 +1,4 @@
-from chess.piece import *
+from piece import *
 
 # All tables are valued for WHITE
 squareTables = {
@@ -0,0 +1,199 @@
+"""
+Opt-in profiling of the AI's search.
+
+Enable with the CHESS_PROFILE environment variable or main.py's --profile flag:
+    cprofile  deterministic cProfile stats per move (.prof for pstats/snakeviz, plus a text report)
+    sample    low-overhead stack sampling per move (text report plus .collapsed stacks for flamegraph.pl/speedscope)
+
+Both modes also time the hot functions of the search. Files are written to CHESS_PROFILE_DIR (default: profiles).
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from board import Board
+from ai import mini_max
+
+PROFILE_MODES = ("cprofile", "sample")
+DEFAULT_OUTPUT_DIR = "profiles"
+
+# (owner, attribute name) of the functions timed during a profiled move. On the search path, king safety
+# and castling go through is_square_attacked, and captures through get_captures and static_exchange;
+# is_in_check only runs in the game loop, outside the profiled search, so it reports no calls there.
+HOT_FUNCTIONS = [
+    (Board, "simulate_move"),
+    (Board, "is_in_check"),
+    (Board, "is_square_attacked"),
+    (Board, "get_captures"),
+    (Board, "static_exchange"),
+    (Board, "get_moves"),
+    (mini_max, "evaluate"),
+]
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread from a background thread.
+
+    Attributes:
+        interval (float): Seconds between samples.
+        counts (Counter): Number of samples per collapsed stack ("outer;...;inner").
+    """
+
+    def __init__(self, thread_id, interval=0.001) -> None:
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        """
+        Returns the samples in collapsed-stack format, one "stack count" line per stack.
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+    def report(self, limit=25) -> str:
+        """
+        Returns the functions seen most often on top of the stack, and the most common stacks.
+        """
+        total = sum(self.counts.values())
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.counts.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+
+        lines = [f"{total} samples", "", f"{'self %':>8} {'total %':>8}  function"]
+        for frame, count in own.most_common(limit):
+            lines.append(f"{100 * count / total:8.1f} {100 * inclusive[frame] / total:8.1f}  {frame}")
+        return "\n".join(lines) + "\n"
+
+
+class SearchProfiler:
+    """
+    Profiles AI moves one at a time, writing a report per move.
+
+    Attributes:
+        mode (str): "cprofile" or "sample".
+        output_dir (str): The directory reports are written to.
+        timings (dict): Calls and total seconds per hot function, for the move being profiled.
+    """
+
+    def __init__(self, mode, output_dir=DEFAULT_OUTPUT_DIR, interval=0.001) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.interval = interval
+        self.timings = {}
+
+    @staticmethod
+    def from_environment(mode=None):
+        """
+        Returns a SearchProfiler for the given mode or the CHESS_PROFILE variable, or None if profiling is off.
+        """
+        mode = mode or os.environ.get("CHESS_PROFILE")
+        if not mode:
+            return None
+        return SearchProfiler(mode, os.environ.get("CHESS_PROFILE_DIR", DEFAULT_OUTPUT_DIR))
+
+    def _timed(self, name, function):
+        timing = self.timings.setdefault(name, [0, 0.0])
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timing[0] += 1
+                timing[1] += time.perf_counter() - start
+        return wrapper
+
+    @contextmanager
+    def profile_move(self, label):
+        """
+        Profiles everything run inside the with block and writes the reports for it.
+
+        Args:
+            label: Identifies the move in the report file names (e.g., the move number).
+        """
+        self.timings = {}
+        originals = [(owner, name, getattr(owner, name)) for owner, name in HOT_FUNCTIONS]
+        for owner, name, function in originals:
+            setattr(owner, name, self._timed(name, function))
+
+        profile, sampler = None, None
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        else:
+            sampler = StackSampler(threading.get_ident(), self.interval)
+            sampler.start()
+
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            if profile:
+                profile.disable()
+            if sampler:
+                sampler.stop()
+            for owner, name, function in originals:
+                setattr(owner, name, function)
+            self._write(label, elapsed, profile, sampler)
+
+    def timing_report(self, elapsed) -> str:
+        lines = [f"Search time: {elapsed * 1000:.1f} ms", "",
+                 f"{'function':<20} {'calls':>9} {'total ms':>10} {'mean us':>9} {'share':>7}"]
+        for name, (calls, seconds) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            mean = seconds / calls * 1e6 if calls else 0.0
+            lines.append(f"{name:<20} {calls:>9} {seconds * 1000:>10.1f} {mean:>9.1f} {100 * seconds / elapsed:>6.1f}%")
+        lines.append("(nested calls, e.g. get_moves inside simulate_move, are counted in both)")
+        return "\n".join(lines) + "\n"
+
+    def _write(self, label, elapsed, profile, sampler):
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"move_{label}")
+        report = self.timing_report(elapsed) + "\n"
+
+        if profile:
+            profile.dump_stats(base + ".prof")
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).sort_stats("cumulative").print_stats(30)
+            report += stream.getvalue()
+        if sampler:
+            with open(base + ".collapsed", "w") as file:
+                file.write(sampler.collapsed())
+            report += sampler.report()
+
+        with open(base + ".txt", "w") as file:
+            file.write(report)
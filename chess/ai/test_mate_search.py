@@ -0,0 +1,42 @@
+"""
+Checks that the mate solver's lines are legal and end in checkmate.
+"""
+import pytest
+
+from board import Board
+from ai.mate_search import find_mate
+
+MATES = [
+    ("6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1", 1),
+    ("r5k1/8/8/8/8/8/5PPP/6K1 b - - 0 1", 1),
+    ("6k1/5ppp/8/8/8/8/8/1R2R1K1 w - - 0 1", 2),
+    ("k7/8/1K6/8/8/8/8/7R w - - 0 1", 2),
+    ("7k/8/6K1/8/8/8/8/R7 w - - 0 1", 2),
+]
+
+
+def is_checkmated(board, color) -> bool:
+    king = board.kings[1 if color == 1 else 0]
+    in_check = board.is_square_attacked(king.pos, -1 if color == 1 else 1)
+    return in_check and not board.get_legal_moves(color)
+
+
+@pytest.mark.parametrize("fen, max_moves", MATES)
+def test_line_ends_in_checkmate(fen, max_moves):
+    board = Board()
+    color = board.load_fen(fen)
+    found, line, _ = find_mate(board, color, max_moves)
+    assert found and len(line) <= 2 * max_moves - 1
+
+    for move in line:
+        assert move in board.get_legal_moves(color)
+        board.make_move(move)
+        color = 1 - color
+    assert is_checkmated(board, color)
+
+
+def test_no_mate():
+    board = Board()
+    color = board.load_fen("8/8/4k3/8/2R5/4K3/8/8 w - - 0 1")
+    found, line, _ = find_mate(board, color, 2)
+    assert found is False and line == []
@@ -0,0 +1,160 @@
+"""
+Transposition table for minimax, with a binary snapshot that persists it between runs.
+
+Snapshot layout: a fixed header (magic, version, entry size, hashing fingerprint, entry count,
+CRC32 of the entries) followed by fixed-size entries sorted by hash. A loaded snapshot is
+memory-mapped and binary searched in place, so a warm start costs one checksum pass.
+"""
+import heapq
+import mmap
+import os
+import struct
+import zlib
+
+from utils import pack_move, unpack_move
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+SNAPSHOT_MAGIC = b"CTTS"
+SNAPSHOT_VERSION = 2
+HEADER = struct.Struct("<4sHHQQI")  # magic, version, entry size, fingerprint, count, crc32
+ENTRY = struct.Struct("<QfhHB")     # hash, score, depth, packed move, flag
+
+
+class TranspositionTable:
+    """
+    Maps position hashes to (depth, score, flag, best move) search results.
+
+    Attributes:
+        capacity (int): The maximum number of entries kept in memory.
+        entries (dict): Entries stored during this run.
+        snapshot (mmap.mmap): The memory-mapped snapshot loaded at startup, if any.
+    """
+
+    def __init__(self, capacity=1_000_000) -> None:
+        self.capacity = capacity
+        self.entries = {}
+        self.snapshot = None
+        self.snapshot_count = 0
+
+    def __len__(self) -> int:
+        return len(self.entries) + self.snapshot_count
+
+    def get(self, key) -> tuple or None:
+        """
+        Returns the (depth, score, flag, move) entry for a hash, or None.
+        """
+        entry = self.entries.get(key)
+        if entry is None and self.snapshot is not None:
+            entry = self._snapshot_get(key)
+        return entry
+
+    def put(self, key, depth, score, flag, move) -> None:
+        """
+        Stores a search result, keeping the deeper entry when the hash is already present.
+        """
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] > depth:
+            return
+        if entry is None and len(self.entries) >= self.capacity:
+            self.entries.clear() # Cheap reset; the snapshot keeps serving older results
+        self.entries[key] = (depth, score, flag, move)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.close()
+
+    def _snapshot_get(self, key) -> tuple or None:
+        """
+        Binary searches the sorted snapshot entries for a hash.
+        """
+        low, high = 0, self.snapshot_count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            entry_key, score, depth, move, flag = ENTRY.unpack_from(self.snapshot, HEADER.size + middle * ENTRY.size)
+            if entry_key == key:
+                return depth, score, flag, unpack_move(move)
+            if entry_key < key:
+                low = middle + 1
+            else:
+                high = middle - 1
+        return None
+
+    def _snapshot_items(self):
+        for index in range(self.snapshot_count):
+            key, score, depth, move, flag = ENTRY.unpack_from(self.snapshot, HEADER.size + index * ENTRY.size)
+            yield key, (depth, score, flag, unpack_move(move))
+
+    def save(self, path, fingerprint) -> int:
+        """
+        Writes the table, merged with the loaded snapshot, to a snapshot file.
+        At most capacity entries are kept, the deepest first, so the file doesn't grow from run to run.
+
+        Args:
+            path (str): The snapshot file to write.
+            fingerprint (int): Identifies the position hashing, so snapshots from other hash keys are rejected.
+
+        Returns:
+            int: The number of entries written.
+        """
+        merged = dict(self._snapshot_items()) if self.snapshot is not None else {}
+        for key, entry in self.entries.items():
+            if key not in merged or merged[key][0] <= entry[0]:
+                merged[key] = entry
+        if len(merged) > self.capacity:
+            merged = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0]))
+
+        payload = b"".join(ENTRY.pack(key, score, depth, pack_move(move), flag)
+                           for key, (depth, score, flag, move) in sorted(merged.items()))
+        header = HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, ENTRY.size, fingerprint, len(merged), zlib.crc32(payload))
+
+        # Write to a temporary file and swap it in, so a crash never leaves a half-written snapshot
+        self.close()
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(header)
+            file.write(payload)
+        os.replace(temp_path, path)
+        return len(merged)
+
+    def load(self, path, fingerprint) -> bool:
+        """
+        Memory-maps a snapshot file, rejecting it if it is stale or corrupt.
+
+        Args:
+            path (str): The snapshot file to load.
+            fingerprint (int): Must match the fingerprint the snapshot was saved with.
+
+        Returns:
+            bool: True if the snapshot was loaded, False if it was missing or rejected.
+        """
+        self.close()
+        try:
+            with open(path, "rb") as file:
+                snapshot = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError): # Missing or empty file
+            return False
+
+        if len(snapshot) < HEADER.size:
+            snapshot.close()
+            return False
+        magic, version, entry_size, file_fingerprint, count, checksum = HEADER.unpack_from(snapshot, 0)
+        valid = (magic == SNAPSHOT_MAGIC and version == SNAPSHOT_VERSION and entry_size == ENTRY.size
+                 and file_fingerprint == fingerprint and len(snapshot) == HEADER.size + count * ENTRY.size)
+        if valid:
+            with memoryview(snapshot) as view, view[HEADER.size:] as payload:
+                valid = zlib.crc32(payload) == checksum
+        if not valid:
+            snapshot.close()
+            return False
+
+        self.snapshot, self.snapshot_count = snapshot, count
+        return True
+
+    def close(self) -> None:
+        """
+        Releases the memory-mapped snapshot.
+        """
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot, self.snapshot_count = None, 0
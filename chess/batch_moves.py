@@ -0,0 +1,186 @@
+"""
+Batched pseudo-legal move generation over many positions at once.
+
+Positions are integer arrays of piece codes (see board.PIECE_CODES and position_squares), and moves are
+kept as bitboards: for every position and from-square, a uint64 of the squares its piece can move to
+(bit row * 8 + col, the board's own square numbering). Every piece of every position is handled by the
+same few array operations, with knight, king and pawn attacks read from precomputed tables and slider
+attacks filled along each ray with shifts and masks.
+
+The moves match Board.get_legal_moves before its king-safety filter: get_moves, plus castling and en passant.
+Promotions are a single move to the last rank, as on the Board.
+"""
+import numpy as np
+
+from board import KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS, NO_EN_PASSANT, position_squares
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7) # Piece codes of white pieces; black adds 8
+BLACK = 8
+
+SQUARE_BITS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+ALL_SQUARES = np.uint64(0xFFFFFFFFFFFFFFFF)
+NOT_COL_0 = np.uint64(0xFEFEFEFEFEFEFEFE)
+NOT_COL_7 = np.uint64(0x7F7F7F7F7F7F7F7F)
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def _table(offsets) -> np.ndarray:
+    table = np.zeros(64, dtype=np.uint64)
+    for square in range(64):
+        row, col = divmod(square, 8)
+        for d_row, d_col in offsets:
+            if 0 <= row + d_row < 8 and 0 <= col + d_col < 8:
+                table[square] |= SQUARE_BITS[(row + d_row) * 8 + col + d_col]
+    return table
+
+
+KNIGHT_ATTACKS = _table(KNIGHT_OFFSETS)
+KING_ATTACKS = _table(KING_OFFSETS)
+PAWN_ATTACKS = np.stack([_table([(-1, -1), (-1, 1)]), _table([(1, -1), (1, 1)])]) # Indexed by color, 0 black and 1 white
+
+# (king column, column the king lands on, rook column) for the castling rights K, Q, k, q, in flag bit order
+CASTLING = [(0, 3, 1, 0), (0, 3, 5, 7), (7, 3, 1, 0), (7, 3, 5, 7)]
+
+
+def _shift(bitboards, direction) -> np.ndarray:
+    """
+    Moves every bit one step in a direction, dropping bits that leave the board.
+    """
+    d_row, d_col = direction
+    amount = 8 * d_row + d_col
+    shifted = bitboards << np.uint64(amount) if amount > 0 else bitboards >> np.uint64(-amount)
+    return shifted & (NOT_COL_0 if d_col == 1 else NOT_COL_7 if d_col == -1 else ALL_SQUARES)
+
+
+def _slide(sliders, empty, direction) -> np.ndarray:
+    """
+    Returns the squares attacked along one direction by the sliders, stopping at (and including) blockers.
+    This is a Kogge-Stone fill: three doubling steps cover the seven squares of a ray.
+    """
+    d_row, d_col = direction
+    wrap = NOT_COL_0 if d_col == 1 else NOT_COL_7 if d_col == -1 else ALL_SQUARES
+    empty = empty & wrap
+    for steps in (1, 2, 4):
+        amount = np.uint64(abs(8 * d_row + d_col) * steps)
+        forward = 8 * d_row + d_col > 0
+        sliders = sliders | (empty & (sliders << amount if forward else sliders >> amount))
+        empty = empty & (empty << amount if forward else empty >> amount)
+    return _shift(sliders, direction)
+
+
+def attack_sets(squares, occupied) -> np.ndarray:
+    """
+    Returns the squares each piece attacks, ignoring the color of what stands there.
+
+    Args:
+        squares (np.ndarray): An (N, 64) array of piece codes.
+        occupied (np.ndarray): An (N,) array of occupancy bitboards.
+
+    Returns:
+        np.ndarray: An (N, 64) uint64 array, the attacks of the piece on each square (0 for empty squares).
+    """
+    kinds, is_white = squares & 7, (squares != 0) & (squares < BLACK)
+    attacks = np.where(kinds == KNIGHT, KNIGHT_ATTACKS, np.uint64(0))
+    attacks |= np.where(kinds == KING, KING_ATTACKS, np.uint64(0))
+    attacks |= np.where(kinds == PAWN, PAWN_ATTACKS[is_white.astype(np.intp), np.arange(64)], np.uint64(0))
+
+    empty = ~occupied[:, None]
+    for directions, slider_kinds in ((ROOK_DIRECTIONS, (ROOK, QUEEN)), (BISHOP_DIRECTIONS, (BISHOP, QUEEN))):
+        sliders = np.where(np.isin(kinds, slider_kinds), SQUARE_BITS, np.uint64(0))
+        if not sliders.any():
+            continue
+        for direction in directions:
+            attacks |= _slide(sliders, empty, direction)
+    return attacks
+
+
+def generate(squares, colors, castling=None, en_passant=None) -> np.ndarray:
+    """
+    Generates the pseudo-legal moves of many positions.
+
+    Args:
+        squares (np.ndarray): An (N, 64) array of piece codes, indexed by row * 8 + col.
+        colors (np.ndarray): The color to move in each position (1 for white, 0 for black).
+        castling (np.ndarray): The castling rights of each position, bits 0 to 3 for K, Q, k, q. Defaults to none.
+        en_passant (np.ndarray): The en passant square of each position, or NO_EN_PASSANT. Defaults to none.
+
+    Returns:
+        np.ndarray: An (N, 64) uint64 array of target bitboards, one per from-square.
+    """
+    squares = np.asarray(squares, dtype=np.uint8)
+    count = len(squares)
+    white_to_move = np.asarray(colors).reshape(count, 1) == 1
+    castling = np.zeros(count, dtype=np.uint8) if castling is None else np.asarray(castling)
+    en_passant = np.full(count, NO_EN_PASSANT) if en_passant is None else np.asarray(en_passant)
+
+    piece_bits = np.where(squares != 0, SQUARE_BITS, np.uint64(0))
+    is_black = squares >= BLACK
+    white = np.bitwise_or.reduce(np.where(is_black, np.uint64(0), piece_bits), axis=1)
+    black = np.bitwise_or.reduce(np.where(is_black, piece_bits, np.uint64(0)), axis=1)
+    occupied = white | black
+    own = np.where(white_to_move[:, 0], white, black)[:, None]
+    enemy = np.where(white_to_move[:, 0], black, white)[:, None]
+    movers = (squares != 0) & (is_black != white_to_move)
+
+    attacks = attack_sets(squares, occupied)
+    pawns = (squares & 7) == PAWN
+    targets = np.where(pawns, np.uint64(0), attacks & ~own)
+
+    # Pawns capture onto enemy pieces or the en passant square, and push onto empty squares
+    has_en_passant = en_passant != NO_EN_PASSANT
+    en_passant_bits = np.where(has_en_passant, SQUARE_BITS[np.where(has_en_passant, en_passant, 0)], np.uint64(0))
+    targets |= np.where(pawns, attacks & (enemy | en_passant_bits[:, None]), np.uint64(0))
+    empty = ~occupied[:, None]
+    single = np.where(white_to_move, SQUARE_BITS << np.uint64(8), SQUARE_BITS >> np.uint64(8)) & empty
+    double = np.where(white_to_move, single << np.uint64(8), single >> np.uint64(8)) & empty
+    start_row = np.where(white_to_move, np.arange(64) // 8 == 1, np.arange(64) // 8 == 6)
+    targets |= np.where(pawns, single | np.where(start_row, double, np.uint64(0)), np.uint64(0))
+    targets = np.where(movers, targets, np.uint64(0))
+
+    # Castling: the right, empty squares up to the rook, and no attacked square on the king's path
+    if castling.any():
+        enemy_attacks = np.bitwise_or.reduce(np.where((squares != 0) & ~movers, attacks, np.uint64(0)), axis=1)
+        for bit, (row, king_col, new_col, rook_col) in enumerate(CASTLING):
+            step = 1 if new_col > king_col else -1
+            between = sum(int(SQUARE_BITS[row * 8 + col]) for col in range(king_col + step, rook_col, step))
+            path = sum(int(SQUARE_BITS[row * 8 + col]) for col in (king_col, king_col + step, new_col))
+            can_castle = (((castling >> bit) & 1) == 1) & (white_to_move[:, 0] == (row == 0)) \
+                & (squares[:, row * 8 + king_col] == KING + (0 if row == 0 else BLACK)) \
+                & (squares[:, row * 8 + rook_col] == ROOK + (0 if row == 0 else BLACK)) \
+                & ((occupied & np.uint64(between)) == 0) & ((enemy_attacks & np.uint64(path)) == 0)
+            targets[:, row * 8 + king_col] |= np.where(can_castle, SQUARE_BITS[row * 8 + new_col], np.uint64(0))
+    return targets
+
+
+def generate_records(positions) -> np.ndarray:
+    """
+    Generates the pseudo-legal moves of packed positions (records from board.position_array).
+    """
+    flags = positions["flags"]
+    return generate(position_squares(positions), 1 - (flags & 1), (flags >> 1) & 0x0F, positions["en_passant"])
+
+
+def move_counts(targets) -> np.ndarray:
+    """
+    Returns the number of moves of each position, from generate's target bitboards.
+    """
+    return POPCOUNT[targets.astype("<u8").view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def move_masks(targets) -> np.ndarray:
+    """
+    Expands generate's target bitboards into an (N, 64, 64) boolean array indexed by [position, from, to].
+    """
+    data = targets.astype("<u8").view(np.uint8).reshape(len(targets), 64, 8)
+    return np.unpackbits(data, axis=2, bitorder="little").astype(bool)
+
+
+def move_list(targets) -> list:
+    """
+    Lists the moves of one position, as ((row, col), (new_row, new_col)) like Board.get_moves.
+
+    Args:
+        targets (np.ndarray): The (64,) target bitboards of the position.
+    """
+    from_squares, to_squares = np.nonzero(move_masks(targets[None])[0])
+    return [(divmod(int(start), 8), divmod(int(end), 8)) for start, end in zip(from_squares, to_squares)]
@@ -0,0 +1,176 @@
+"""
+Search benchmark with a recorded baseline.
+
+Runs the search on a fixed set of positions at a fixed depth and node limit, records nodes, nps,
+time to each depth, best move and peak memory per position, and compares them with a baseline.
+A node count that differs from the baseline means the search itself changed; an nps drop beyond
+the threshold is a throughput regression. Either makes the command exit with status 1.
+
+Usage:
+    python bench.py                   compare with bench_baseline.json
+    python bench.py --save-baseline   record a new baseline
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from board import Board
+from ai import mini_max
+from ai.analysis import move_to_string
+
+DEFAULT_BASELINE_PATH = "bench_baseline.json"
+BENCH_DEPTH = 3
+BENCH_NODE_LIMIT = 20_000
+
+BENCH_POSITIONS = {
+    "start": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "italian": "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "kiwipete": "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "tactics": "r2q1rk1/ppp2ppp/2n1bn2/2bpp3/4P3/2PP1N2/PP1NBPPP/R1BQ1RK1 b - - 0 8",
+    "rook_endgame": "8/8/4k3/8/2R5/4K3/8/8 w - - 0 1",
+    "pawn_endgame": "8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 0 1",
+}
+
+
+def run_position(fen, depth, node_limit, repeat) -> dict:
+    """
+    Searches one position from a cold start and returns its measurements.
+    Timings are the fastest of repeat runs, which keeps scheduler noise out of the nps.
+    """
+    elapsed, depth_times = None, None
+    for _ in range(repeat):
+        mini_max.transposition_table.clear()
+        board = Board()
+        color = board.load_fen(fen)
+        run_depth_times = {}
+        start = time.perf_counter()
+
+        def record_depth(completed_depth, *_):
+            run_depth_times[completed_depth] = round(time.perf_counter() - start, 4)
+
+        score, best_move, pv, reached_depth = mini_max.search(board, depth=depth, color=color,
+                                                              node_limit=node_limit, on_depth=record_depth)
+        run_elapsed = time.perf_counter() - start
+        if elapsed is None or run_elapsed < elapsed:
+            elapsed, depth_times = run_elapsed, run_depth_times
+    nodes = mini_max.search_stats.nodes
+
+    # Measure memory in a second, identical run, so tracing doesn't slow the timed one
+    mini_max.transposition_table.clear()
+    board = Board()
+    board.load_fen(fen)
+    tracemalloc.start()
+    mini_max.search(board, depth=depth, color=color, node_limit=node_limit)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "nodes": nodes,
+        "time": round(elapsed, 4),
+        "nps": round(nodes / elapsed) if elapsed else 0,
+        "depth": reached_depth,
+        "time_to_depth": depth_times,
+        "score": float(score),
+        "best_move": move_to_string(best_move) if best_move else None,
+        "peak_memory_kb": round(peak_memory / 1024, 1),
+    }
+
+
+def run_bench(depth=BENCH_DEPTH, node_limit=BENCH_NODE_LIMIT, repeat=3) -> dict:
+    positions = {}
+    for name, fen in BENCH_POSITIONS.items():
+        positions[name] = run_position(fen, depth, node_limit, repeat)
+        print(f"{name:<14} nodes {positions[name]['nodes']:>7}  nps {positions[name]['nps']:>7}  "
+              f"time {positions[name]['time']:>7.2f}s  best {positions[name]['best_move']}")
+
+    nodes = sum(result["nodes"] for result in positions.values())
+    elapsed = sum(result["time"] for result in positions.values())
+    return {
+        "depth": depth,
+        "node_limit": node_limit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "total": {"nodes": nodes, "time": round(elapsed, 4), "nps": round(nodes / elapsed) if elapsed else 0},
+        "positions": positions,
+    }
+
+
+def compare(results, baseline, threshold) -> tuple:
+    """
+    Returns the differences from the baseline that count as regressions, and notes that don't.
+    Single positions run for fractions of a second, so their nps drops are notes; the total nps is the gate.
+
+    Args:
+        results (dict): The results of run_bench.
+        baseline (dict): The stored baseline, from an earlier run_bench.
+        threshold (float): The allowed nps drop as a fraction (e.g., 0.1 for 10%).
+    """
+    problems, notes = [], []
+    if (results["depth"], results["node_limit"]) != (baseline["depth"], baseline["node_limit"]):
+        return [f"Baseline was recorded at depth {baseline['depth']} / {baseline['node_limit']} nodes; re-record it"], notes
+
+    for name, result in results["positions"].items():
+        expected = baseline["positions"].get(name)
+        if expected is None:
+            problems.append(f"{name}: not in the baseline")
+            continue
+        if result["nodes"] != expected["nodes"]:
+            problems.append(f"{name}: node count changed {expected['nodes']} -> {result['nodes']} (search behavior changed)")
+        if result["best_move"] != expected["best_move"]:
+            notes.append(f"{name}: best move changed {expected['best_move']} -> {result['best_move']}")
+        if expected["nps"] and result["nps"] < expected["nps"] * (1 - threshold):
+            notes.append(f"{name}: nps dropped {expected['nps']} -> {result['nps']} "
+                            f"({100 * (1 - result['nps'] / expected['nps']):.1f}%)")
+
+    total, expected_total = results["total"]["nps"], baseline["total"]["nps"]
+    if expected_total and total < expected_total * (1 - threshold):
+        problems.append(f"total: nps dropped {expected_total} -> {total} ({100 * (1 - total / expected_total):.1f}%)")
+    return problems, notes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the search against a recorded baseline.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="record the results as the new baseline")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed nps drop (default: 0.10)")
+    parser.add_argument("--depth", type=int, default=BENCH_DEPTH)
+    parser.add_argument("--nodes", type=int, default=BENCH_NODE_LIMIT, help="node limit per position")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per position, fastest is kept")
+    args = parser.parse_args()
+
+    results = run_bench(args.depth, args.nodes, args.repeat)
+    print(f"{'total':<14} nodes {results['total']['nodes']:>7}  nps {results['total']['nps']:>7}  "
+          f"time {results['total']['time']:>7.2f}s")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; record one with --save-baseline")
+        return
+
+    problems, notes = compare(results, baseline, args.threshold)
+    for note in notes:
+        print(f"NOTE {note}")
+    for problem in problems:
+        print(f"REGRESSION {problem}")
+    if problems:
+        sys.exit(1)
+    print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,66 @@
 import copy
+import random
+import struct
 import numpy as np
-from piece import Piece, Pawn, Rook, Knight, Bishop, Queen, King
+from piece import Piece, Pawn, Rook, Knight, Bishop, Queen, King, PIECE_VALUES
+from move_cache import MoveCache
+from renderer import BoardRenderer
+from utils import square_to_pos, pos_to_square
+
+KNIGHT_OFFSETS = [(2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+BISHOP_DIRECTIONS = [(1, 1), (1, -1), (-1, 1), (-1, -1)]
+# Capture offsets of each piece type (pawns depend on color), and whether the piece slides along them
+CAPTURE_PATTERNS = {Knight: (KNIGHT_OFFSETS, False), King: (KING_OFFSETS, False), Rook: (ROOK_DIRECTIONS, True),
+                    Bishop: (BISHOP_DIRECTIONS, True), Queen: (ROOK_DIRECTIONS + BISHOP_DIRECTIONS, True)}
+FEN_PIECES = {"P": Pawn, "N": Knight, "B": Bishop, "R": Rook, "Q": Queen, "K": King}
+
+# Zobrist keys, seeded so that position hashes can be stored and compared between runs
+_zobrist_random = random.Random(0x5EED)
+ZOBRIST_PIECES = {piece_id: [_zobrist_random.getrandbits(64) for _ in range(64)] for piece_id in "PNBRQKpnbrqk"}
+ZOBRIST_CASTLING = [_zobrist_random.getrandbits(64) for _ in range(4)]
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for _ in range(8)]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+# Packed positions: 64 squares of 4-bit piece codes (row * 8 + col, low nibble first), a flags byte
+# (bit 0 black to move, bits 1-4 castling rights KQkq), the en passant square (0xFF for none) and both clocks
+PIECE_CODES = {piece_id: index + 1 for index, piece_id in enumerate("PNBRQK")}
+PIECE_CODES.update({piece_id.lower(): code + 8 for piece_id, code in PIECE_CODES.items()})
+CODE_PIECES = {code: (FEN_PIECES[piece_id.upper()], 1 if piece_id.isupper() else -1) for piece_id, code in PIECE_CODES.items()}
+PACKED_POSITION = struct.Struct("<32sBBHH")
+POSITION_DTYPE = np.dtype([("squares", np.uint8, 32), ("flags", np.uint8), ("en_passant", np.uint8),
+                           ("halfmove_clock", "<u2"), ("fullmove_number", "<u2")])
+NO_EN_PASSANT = 0xFF
+
+
+def position_array(buffer) -> np.ndarray:
+    """
+    Views a buffer of packed positions (from Board.to_bytes) as a structured array, without copying.
+
+    Args:
+        buffer: Any bytes-like object or memory map holding whole packed positions.
+
+    Returns:
+        np.ndarray: One POSITION_DTYPE record per position.
+    """
+    return np.frombuffer(buffer, dtype=POSITION_DTYPE)
+
+
+def position_squares(positions) -> np.ndarray:
+    """
+    Unpacks the squares of many packed positions at once.
+
+    Args:
+        positions (np.ndarray): Records from position_array.
+
+    Returns:
+        np.ndarray: An (N, 64) array of piece codes, indexed by row * 8 + col.
+    """
+    squares = np.empty((len(positions), 64), dtype=np.uint8)
+    squares[:, 0::2] = positions["squares"] & 0x0F
+    squares[:, 1::2] = positions["squares"] >> 4
+    return squares
 
 
 class Board:
@@ -18,16 +78,36 @@ class Board:
         move_piece(current_pos, new_pos): Moves a chess piece from the current position to the new position.
         get_piece_from(pos): Retrieves the chess piece at the specified position.
         set_piece_at(pos, old_pos, piece): Sets a chess piece at the specified position and updates its old position.
+        make_move(move, promotion): Plays a move in place without validating or printing it.
+        get_legal_moves(color): Gets the fully legal moves of a color, including castling and en passant.
+        is_square_attacked(pos, by_color): Checks if a square is attacked by the given color.
+        get_captures(color): Gets the captures of a color without generating its quiet moves.
+        static_exchange(move): Resolves the captures on a move's target square and returns the material balance.
+        load_fen(fen): Sets up the board from a FEN string.
+        get_fen(color): Returns the FEN string of the current position.
+        to_bytes(color): Packs the position into a fixed-size binary record.
+        from_bytes(data): Sets up the board from a packed position.
+        get_hash(copy_board, color): Computes the Zobrist hash of a position.
+        is_repetition(position_hash): Checks if a position occurred since the last irreversible move.
+        is_draw(color): Checks for a draw by threefold repetition or the fifty-move rule.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, renderer=None) -> None:
         """
         Initializes the Board object.
+
+        Args:
+            renderer (BoardRenderer): Draws the board for print_board. Defaults to a full-frame BoardRenderer.
         """
         self.white_pieces, self.white_threats = None, None
         self.black_pieces, self.black_threats = None, None
+        self.en_passant = None # Square a pawn skipped over on the last move, if any
+        self.history = [] # Hashes of the positions before the current one
+        self.halfmove_clock = 0 # Plies since the last capture or pawn move
+        self.fullmove_number = 1
         self.board = self.create_start_board()
-        self.piece_count = 32 # Count of the number of pieces on the board--used to determine when to update the piece lists
+        self.renderer = renderer if renderer is not None else BoardRenderer()
+        self.move_cache = MoveCache()
         self.update_piece_lists()
         self.kings = [self.get_piece_from((7, 3)), self.get_piece_from((0, 3))]
 
@@ -82,37 +162,9 @@ class Board:
 
     def print_board(self, copy_board=None):
         """
-        Prints the current state of the chess board.
+        Prints the current state of the chess board in a single write.
         """
-        board = copy_board if copy_board is not None else self.board
-        row_label = [1, 2, 3, 4, 5, 6, 7, 8]
-        sum_pieces = 0
-        print("    a  b  c  d  e  f  g  h")
-        for index, i in enumerate(board):
-            print(row_label[index], end = "  ")
-            for jndex, piece in enumerate(i):
-                sum_pieces += 1 if piece else 0
-                # Print Colors
-                if (index + jndex) % 2 == 0:
-                    print("\033[48;5;208m", end="")
-                else:
-                    print("\033[48;5;166m", end="")
-
-                # Print piece
-                if piece is None:
-                    print("  ", end=" ")
-                elif piece.id.isupper(): # - black
-                    print("\033[97m" + " " + piece.id, end=" ")
-                else: # piece.id.islower() - white
-                    print("\033[30m" + " " + piece.id, end=" ")
-
-                # Reset color
-                print("\033[0m", end="")
-            print("\033[0m")
-        print("    a  b  c  d  e  f  g  h")
-
-        self.update_piece_lists() if sum_pieces < self.piece_count else None 
-        self.piece_count = sum_pieces
+        self.renderer.draw(copy_board if copy_board is not None else self.board)
 
     def move_piece(self, current_pos, new_pos, player_checked=False):
         """
@@ -146,7 +198,7 @@ class Board:
             
             else: # If the king is no longer in check
                 self.board[current_pos[0]][current_pos[1]], self.board[new_pos[0]][new_pos[1]] = piece, original_piece # Restore pieces
-                self.set_piece_at(new_pos, current_pos, piece)
+                self.make_move((current_pos, new_pos))
                 return True
         
         # If the player is not in check
@@ -158,22 +210,22 @@ class Board:
 
                 elif moved == 'castle': # If the piece is a king and the king moved laterally 2 spaces
                     if self.can_king_castle(new_pos, piece): # If the king can castle
-                        self.castle_king(new_pos, piece) # Castle the king
+                        self.make_move((current_pos, new_pos)) # Castle the king
                         return True
                     print(f"Invalid Castle: {current_pos} -> {new_pos}", end="\n\n")
                     return False
     
                 else: # Regular move
-                    self.set_piece_at(new_pos, current_pos, piece)
+                    self.make_move((current_pos, new_pos))
                     return True
                     
             elif isinstance(moved, Queen): # If the result of moving the piece is a queen, it was a pawn promotion
-                self.set_piece_at(new_pos, current_pos, moved)
+                self.make_move((current_pos, new_pos))
                 return True
             
             # Regular move
             else:
-                self.set_piece_at(new_pos, current_pos, piece)
+                self.make_move((current_pos, new_pos))
                 return True
         else:
             print(f"Invalid move: {current_pos} -> {new_pos}", end="\n\n")
@@ -214,27 +266,97 @@ class Board:
         piece.pos = pos
         piece.has_moved = True
     
-    def get_moves(self, color=int) -> list:
+    def get_moves(self, color=int, copy_board=None, position_hash=None) -> list:
         """
         Gets the valid moves for all pieces of a specific color on the board.
+        Move lists are cached by position hash, so revisited positions skip move generation.
 
         Args:
-            color (int): The color of the pieces to get the valid moves for.
-        """
-        if color == 1:
-            pieces = self.white_pieces
+            color (int): The color of the pieces to get the valid moves for (1 for white, 0 for black).
+            copy_board (np.ndarray): A simulated board to get the moves on. Defaults to the game board.
+            position_hash (int): The position's get_hash, if the caller already has it.
+        """
+        if position_hash is None:
+            position_hash = self.get_hash(copy_board, color)
+        cached = self.move_cache.get(position_hash, color)
+        if cached is not None:
+            return cached
+
+        if copy_board is not None:
+            piece_color = 1 if color == 1 else -1
+            pieces = [piece for row in copy_board for piece in row if piece is not None and piece.color == piece_color]
+        elif color == 1:
+            pieces = self.white_pieces + self.kings[1:]
         elif color == 0:
-            pieces = self.black_pieces
+            pieces = self.black_pieces + self.kings[:1]
 
+        board = copy_board if copy_board is not None else self.board
         valid_moves = []
         for piece in pieces:
-            for valid_move in piece.get_all_moves(self.board):
+            for valid_move in piece.get_all_moves(board):
                 if valid_move:
-                    if type(piece) == Pawn: print(valid_move)
                     valid_moves.append(valid_move)
 
+        self.move_cache.put(position_hash, color, valid_moves)
         return valid_moves
 
+    def get_legal_moves(self, color) -> list:
+        """
+        Gets the fully legal moves of a color on the game board, including castling and en passant.
+
+        Args:
+            color (int): The color to move (1 for white, 0 for black).
+
+        Returns:
+            list: The moves as ((row, col), (new_row, new_col)).
+        """
+        piece_color = 1 if color == 1 else -1
+        moves = list(self.get_moves(color))
+
+        king = self.kings[1 if color == 1 else 0]
+        for step in (-2, 2):
+            new_pos = (king.pos[0], king.pos[1] + step)
+            if king.pos[1] == 3 and self.can_king_castle(new_pos, king):
+                moves.append((king.pos, new_pos))
+
+        if self.en_passant:
+            row = self.en_passant[0] - (1 if piece_color == 1 else -1)
+            for col in (self.en_passant[1] - 1, self.en_passant[1] + 1):
+                piece = self.board[row][col] if 0 <= col < 8 else None
+                if isinstance(piece, Pawn) and piece.color == piece_color:
+                    moves.append(((row, col), self.en_passant))
+
+        return [move for move in moves if not self.exposes_king(move)]
+
+    def get_hash(self, copy_board=None, color=1) -> int:
+        """
+        Computes the Zobrist hash of a position. The keys are seeded, so hashes are stable across runs.
+
+        Args:
+            copy_board (np.ndarray): A simulated board to hash. Defaults to the game board.
+            color (int): The color to move (1 for white, 0 for black).
+
+        Returns:
+            int: A 64-bit hash of the pieces, castling rights, en passant square and side to move.
+        """
+        board = copy_board if copy_board is not None else self.board
+        position_hash = 0
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece is not None:
+                    position_hash ^= ZOBRIST_PIECES[piece.id][row * 8 + col]
+
+        for index, (row, rook_col) in enumerate(((0, 0), (0, 7), (7, 0), (7, 7))):
+            king, rook = board[row][3], board[row][rook_col]
+            if isinstance(king, King) and isinstance(rook, Rook) and not (king.has_moved or rook.has_moved):
+                position_hash ^= ZOBRIST_CASTLING[index]
+
+        if copy_board is None and self.en_passant: # Simulated boards don't track en passant
+            position_hash ^= ZOBRIST_EN_PASSANT[self.en_passant[1]]
+        if color == 0:
+            position_hash ^= ZOBRIST_BLACK_TO_MOVE
+        return position_hash
 
     # TODO: Optimize 
     def is_in_check(self, at_location=None) -> tuple or bool:
@@ -387,39 +509,28 @@ class Board:
         """
         board = copy_board if copy_board is not None else self.board
         row, col = king.pos
-        new_row, new_col = new_pos
-
-        if king.has_moved or self.get_piece_from(new_pos).has_moved:
-            return False
-        
-        # Check if the king is in check
-        if self.is_in_check([king.pos, king.color]):
-            print("Can't castle while in check!")
-            return False
+        _, new_col = new_pos
 
         step = 1 if new_col > col else -1
         rook_col = 7 if step == 1 else 0
 
-        # Check if the king is castling with a rook
-        rook = self.get_piece_from((row, rook_col))
-        if not rook or not isinstance(rook, Rook):
-            print("Can't castle without a rook!")
+        # Check if the king is castling with an unmoved rook
+        rook = board[row][rook_col]
+        if king.has_moved or not isinstance(rook, Rook) or rook.has_moved or rook.color != king.color:
             return False
 
         # Check if there are any pieces between the king and the rook
-        # and check if the king is moving into check
-        for c in range(col+step, new_col-step, step):
-            if board[row][c] is not None or (self.is_in_check([(row, c), king.color])):
-                print("Can't castle through pieces or check!")
+        for c in range(col + step, rook_col, step):
+            if board[row][c] is not None:
                 return False
-        
-        # Check if the king's new destination is in check
-        if self.is_in_check([(row, new_col), king.color]):
-            print("Can't castle into check!")
-            return False
-        
+
+        # The king can't castle out of, through, or into check
+        for c in (col, col + step, new_col):
+            if self.is_square_attacked((row, c), -king.color, board):
+                return False
+
         return True
-    
+
     def castle_king(self, new_pos, king, copy_board=None) -> None:
         """
         Castles the king to the given position on the given board.
@@ -436,19 +547,20 @@ class Board:
         rook_col = 7 if step == 1 else 0
         move_rook_col = col + step
 
-        rook = self.get_piece_from((row, rook_col))
+        rook = self.get_piece_from((row, rook_col), board)
 
         self.set_piece_at(new_pos, king.pos, king, board)
         self.set_piece_at((row, move_rook_col), (row, rook_col), rook, board)
 
-    def simulate_move(self, move) -> np.ndarray:
+    def simulate_move(self, move, copy_board=None) -> np.ndarray:
         """
         Simulates a move on the board.
 
         Args:
             move (tuple): The move to simulate.
+            copy_board (np.ndarray): A simulated board to play the move on. Defaults to the game board.
         """
-        c_board = copy.deepcopy(self.board)
+        c_board = copy.deepcopy(copy_board if copy_board is not None else self.board)
         current_pos, new_pos = move
         piece = self.get_piece_from(current_pos, c_board)
 
@@ -458,11 +570,423 @@ class Board:
                     self.castle_king(new_pos, piece, c_board)
                     return c_board  # Return the copied board with the move applied
                 return c_board  # Return the copied board without the move if castling is invalid
-            elif isinstance(moved, Queen):  # Pawn promotion
-                self.set_piece_at(new_pos, current_pos, moved, c_board)
+            elif isinstance(piece, Pawn) and new_pos[0] in (0, 7):  # Pawn promotion
+                self.set_piece_at(new_pos, current_pos, Queen(piece.color, new_pos), c_board)
                 return c_board
             else:  # Regular move
                 self.set_piece_at(new_pos, current_pos, piece, c_board)
                 return c_board
         else:
             return c_board  # Return the copied board without the move if the move is invalid
+
+    def make_move(self, move, promotion=None):
+        """
+        Plays a move on the board in place, without validating or printing it.
+        Handles castling, en passant and promotion, and keeps the piece lists current.
+
+        Args:
+            move (tuple): The move as ((row, col), (new_row, new_col)).
+            promotion (type): The piece class a pawn promotes to. Defaults to Queen.
+
+        Returns:
+            Piece: The captured piece, or None.
+        """
+        current_pos, new_pos = move
+        piece = self.get_piece_from(current_pos)
+        captured = self.get_piece_from(new_pos)
+        self.history.append(self.get_hash(color=1 if piece.color == 1 else 0))
+        self.halfmove_clock = 0 if captured or isinstance(piece, Pawn) else self.halfmove_clock + 1
+        self.fullmove_number += 1 if piece.color != 1 else 0
+        en_passant, self.en_passant = self.en_passant, None
+        promoted = False
+
+        if isinstance(piece, King) and abs(new_pos[1] - current_pos[1]) == 2:
+            self.castle_king(new_pos, piece)
+            return None
+
+        if isinstance(piece, Pawn):
+            if new_pos == en_passant and captured is None: # En passant
+                captured = self.get_piece_from((current_pos[0], new_pos[1]))
+                self.board[current_pos[0]][new_pos[1]] = None
+            elif abs(new_pos[0] - current_pos[0]) == 2:
+                self.en_passant = ((current_pos[0] + new_pos[0]) // 2, current_pos[1])
+
+            if new_pos[0] in (0, 7):
+                piece = (promotion or Queen)(piece.color, current_pos)
+                promoted = True
+
+        self.set_piece_at(new_pos, current_pos, piece)
+        if captured or promoted:
+            self.update_piece_lists()
+        return captured
+
+    def exposes_king(self, move) -> bool:
+        """
+        Checks if a move would leave the mover's own king attacked.
+
+        Args:
+            move (tuple): The move as ((row, col), (new_row, new_col)).
+
+        Returns:
+            bool: True if the move is illegal because of check, False otherwise.
+        """
+        (row, col), (new_row, new_col) = move
+        piece = self.board[row][col]
+        captured_pos = (new_row, new_col)
+        if isinstance(piece, Pawn) and captured_pos == self.en_passant and self.board[new_row][new_col] is None:
+            captured_pos = (row, new_col)
+        captured = self.board[captured_pos[0]][captured_pos[1]]
+
+        # Temp move
+        self.board[row][col], self.board[captured_pos[0]][captured_pos[1]] = None, None
+        self.board[new_row][new_col] = piece
+        king_pos = (new_row, new_col) if isinstance(piece, King) else self.kings[1 if piece.color == 1 else 0].pos
+        exposed = self.is_square_attacked(king_pos, -piece.color)
+
+        # Restore pieces
+        self.board[new_row][new_col] = None
+        self.board[captured_pos[0]][captured_pos[1]] = captured
+        self.board[row][col] = piece
+        return exposed
+
+    def is_square_attacked(self, pos, by_color, copy_board=None) -> bool:
+        """
+        Checks if a square is attacked by any piece of the given color.
+
+        Args:
+            pos (tuple): The square as a tuple of row and column indices.
+            by_color (int): The color of the attacking pieces (1 or -1).
+
+        Returns:
+            bool: True if the square is attacked, False otherwise.
+        """
+        board = copy_board if copy_board is not None else self.board
+        row, col = pos
+
+        def attacker(r, c, kinds):
+            if 0 <= r < 8 and 0 <= c < 8:
+                piece = board[r][c]
+                return piece is not None and piece.color == by_color and isinstance(piece, kinds)
+            return False
+
+        # Pawns attack diagonally forward, so look one row behind the square
+        pawn_row = row - (1 if by_color == 1 else -1)
+        if attacker(pawn_row, col - 1, Pawn) or attacker(pawn_row, col + 1, Pawn):
+            return True
+
+        for d_row, d_col in KNIGHT_OFFSETS:
+            if attacker(row + d_row, col + d_col, Knight):
+                return True
+
+        for d_row, d_col in KING_OFFSETS:
+            if attacker(row + d_row, col + d_col, King):
+                return True
+
+        # Sliders: walk each ray until the first piece
+        for directions, kinds in ((ROOK_DIRECTIONS, (Rook, Queen)), (BISHOP_DIRECTIONS, (Bishop, Queen))):
+            for d_row, d_col in directions:
+                r, c = row + d_row, col + d_col
+                while 0 <= r < 8 and 0 <= c < 8:
+                    if board[r][c] is not None:
+                        if attacker(r, c, kinds):
+                            return True
+                        break
+                    r += d_row
+                    c += d_col
+        return False
+
+    def get_captures(self, color, copy_board=None) -> list:
+        """
+        Gets the captures of a color without generating its quiet moves. The result matches the captures in get_moves.
+
+        Args:
+            color (int): The color to capture with (1 for white, 0 for black).
+            copy_board (np.ndarray): A simulated board to get the captures on. Defaults to the game board.
+        """
+        board = copy_board if copy_board is not None else self.board
+        piece_color = 1 if color == 1 else -1
+        pawn_offsets = [(piece_color, -1), (piece_color, 1)]
+        captures = []
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece is None or piece.color != piece_color:
+                    continue
+                offsets, slides = CAPTURE_PATTERNS.get(type(piece), (pawn_offsets, False))
+                for d_row, d_col in offsets:
+                    r, c = row + d_row, col + d_col
+                    while 0 <= r < 8 and 0 <= c < 8:
+                        target = board[r][c]
+                        if target is not None:
+                            if target.color != piece_color:
+                                captures.append(((row, col), (r, c)))
+                            break
+                        if not slides:
+                            break
+                        r += d_row
+                        c += d_col
+        return captures
+
+    def least_valuable_attacker(self, pos, by_color, removed=(), copy_board=None) -> tuple or None:
+        """
+        Finds the cheapest piece of a color attacking a square. Squares in removed count as empty,
+        so sliders behind a piece that already captured (x-rays) are found.
+
+        Args:
+            pos (tuple): The attacked square as a tuple of row and column indices.
+            by_color (int): The color of the attacking pieces (1 or -1).
+            removed (set): Squares whose pieces have already been used up.
+
+        Returns:
+            tuple: The position of the attacker, or None.
+        """
+        board = copy_board if copy_board is not None else self.board
+        row, col = pos
+
+        def attacker(r, c, kinds):
+            if 0 <= r < 8 and 0 <= c < 8 and (r, c) not in removed:
+                piece = board[r][c]
+                return piece is not None and piece.color == by_color and isinstance(piece, kinds)
+            return False
+
+        pawn_row = row - (1 if by_color == 1 else -1)
+        for c in (col - 1, col + 1):
+            if attacker(pawn_row, c, Pawn):
+                return (pawn_row, c)
+
+        for d_row, d_col in KNIGHT_OFFSETS:
+            if attacker(row + d_row, col + d_col, Knight):
+                return (row + d_row, col + d_col)
+
+        # Sliders: the first piece on each ray, looking through removed squares
+        best, best_value = None, None
+        for directions, kinds in ((BISHOP_DIRECTIONS, (Bishop, Queen)), (ROOK_DIRECTIONS, (Rook, Queen))):
+            for d_row, d_col in directions:
+                r, c = row + d_row, col + d_col
+                while 0 <= r < 8 and 0 <= c < 8:
+                    if board[r][c] is not None and (r, c) not in removed:
+                        if attacker(r, c, kinds) and (best is None or PIECE_VALUES[type(board[r][c])] < best_value):
+                            best, best_value = (r, c), PIECE_VALUES[type(board[r][c])]
+                        break
+                    r += d_row
+                    c += d_col
+        if best is not None:
+            return best
+
+        for d_row, d_col in KING_OFFSETS:
+            if attacker(row + d_row, col + d_col, King):
+                return (row + d_row, col + d_col)
+        return None
+
+    def static_exchange(self, move, copy_board=None) -> int:
+        """
+        Resolves the sequence of captures on a move's target square, each side recapturing with its
+        cheapest piece and free to stop when recapturing would lose material.
+
+        Args:
+            move (tuple): The move as ((row, col), (new_row, new_col)).
+
+        Returns:
+            int: The material the moving side gains (negative if it loses material), in pawns.
+        """
+        board = copy_board if copy_board is not None else self.board
+        (row, col), target = move
+        piece, captured = board[row][col], board[target[0]][target[1]]
+
+        gain = [PIECE_VALUES[type(captured)] if captured is not None else 0]
+        on_square = PIECE_VALUES[type(piece)]
+        removed, color = {(row, col)}, -piece.color
+        while True:
+            gain.append(on_square - gain[-1]) # What the side to move nets if it recaptures
+            attacker_pos = self.least_valuable_attacker(target, color, removed, board)
+            if attacker_pos is None:
+                break
+            on_square = PIECE_VALUES[type(board[attacker_pos[0]][attacker_pos[1]])]
+            removed.add(attacker_pos)
+            color = -color
+
+        # Each side may stop capturing instead, so fold back from the end; the last entry is speculative
+        for index in range(len(gain) - 2, 0, -1):
+            gain[index - 1] = -max(-gain[index - 1], gain[index])
+        return gain[0]
+
+    def load_fen(self, fen) -> int:
+        """
+        Sets up the board from a FEN string.
+        FEN squares are standard (king on e1), so files map onto mirrored columns.
+
+        Args:
+            fen (str): The position in Forsyth-Edwards Notation.
+
+        Returns:
+            int: The color to move (1 for white, 0 for black).
+        """
+        fields = fen.split()
+        placement, side = fields[0], fields[1] if len(fields) > 1 else "w"
+        castling = fields[2] if len(fields) > 2 else "-"
+        en_passant = fields[3] if len(fields) > 3 else "-"
+        halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        fullmove_number = int(fields[5]) if len(fields) > 5 else 1
+
+        ranks = placement.split("/")
+        if len(ranks) != 8:
+            raise ValueError(f"Invalid FEN placement: '{placement}'")
+
+        board = np.full((8, 8), None, dtype=object)
+        for rank_index, rank in enumerate(ranks):
+            row, file = 7 - rank_index, 0
+            for char in rank:
+                if char.isdigit():
+                    file += int(char)
+                    continue
+                if char.upper() not in FEN_PIECES or file > 7:
+                    raise ValueError(f"Invalid FEN placement: '{placement}'")
+                pos = (row, 7 - file)
+                board[pos[0]][pos[1]] = FEN_PIECES[char.upper()](1 if char.isupper() else -1, pos)
+                file += 1
+
+        en_passant = square_to_pos(en_passant) if en_passant != "-" else None
+        self.set_position(board, castling.replace("-", ""), en_passant, halfmove_clock, fullmove_number)
+        return 1 if side == "w" else 0
+
+    def set_position(self, board, castling, en_passant, halfmove_clock, fullmove_number) -> None:
+        """
+        Replaces the position, deriving the pieces' has_moved flags from their ranks and the castling rights.
+
+        Args:
+            board (np.ndarray): The 2D array of pieces.
+            castling (str): The castling rights, as in FEN (e.g., "KQkq", or "" for none).
+            en_passant (tuple): The square a pawn skipped over on the last move, or None.
+            halfmove_clock (int): Plies since the last capture or pawn move.
+            fullmove_number (int): The number of the current full move.
+        """
+        for row in board:
+            for piece in row:
+                if isinstance(piece, Pawn) and piece.pos[0] in (0, 7):
+                    raise ValueError(f"Invalid position, pawn on {pos_to_square(piece.pos)}")
+                if isinstance(piece, Pawn):
+                    piece.has_moved = piece.pos[0] != (1 if piece.color == 1 else 6)
+                elif isinstance(piece, (King, Rook)):
+                    piece.has_moved = True
+
+        # Castling rights are kept as has_moved flags on the king and rook
+        for right in castling:
+            row = 0 if right.isupper() else 7
+            for pos in ((row, 3), (row, 0 if right.upper() == "K" else 7)):
+                if board[pos[0]][pos[1]] is not None:
+                    board[pos[0]][pos[1]].has_moved = False
+
+        self.board = board
+        self.en_passant = en_passant
+        self.history, self.halfmove_clock, self.fullmove_number = [], halfmove_clock, fullmove_number
+        self.update_piece_lists()
+        if len(self.kings) != 2:
+            raise ValueError("Invalid position, expected two kings")
+
+    def get_fen(self, color=1) -> str:
+        """
+        Returns the FEN string of the current position.
+
+        Args:
+            color (int): The color to move (1 for white, 0 for black).
+
+        Returns:
+            str: The position in Forsyth-Edwards Notation.
+        """
+        ranks = []
+        for row in range(7, -1, -1):
+            rank, empty = "", 0
+            for col in range(7, -1, -1):
+                piece = self.board[row][col]
+                if piece is None:
+                    empty += 1
+                    continue
+                rank += (str(empty) if empty else "") + piece.id
+                empty = 0
+            ranks.append(rank + (str(empty) if empty else ""))
+
+        en_passant = pos_to_square(self.en_passant) if self.en_passant else "-"
+        return f"{'/'.join(ranks)} {'w' if color == 1 else 'b'} {self.castling_rights() or '-'} {en_passant} {self.halfmove_clock} {self.fullmove_number}"
+
+    def castling_rights(self) -> str:
+        """
+        Returns the castling rights as in FEN (e.g., "KQkq"), or an empty string if there are none.
+        """
+        castling = ""
+        for right, (row, rook_col) in zip("KQkq", ((0, 0), (0, 7), (7, 0), (7, 7))):
+            king, rook = self.board[row][3], self.board[row][rook_col]
+            if isinstance(king, King) and isinstance(rook, Rook) and not (king.has_moved or rook.has_moved):
+                castling += right
+        return castling
+
+    def to_bytes(self, color=1) -> bytes:
+        """
+        Packs the position into PACKED_POSITION.size (38) bytes. The move history is not included.
+
+        Args:
+            color (int): The color to move (1 for white, 0 for black).
+
+        Returns:
+            bytes: The packed position, readable by from_bytes or position_array.
+        """
+        codes = [PIECE_CODES[piece.id] if piece is not None else 0 for row in self.board for piece in row]
+        squares = bytes(codes[index] | codes[index + 1] << 4 for index in range(0, 64, 2))
+        castling = self.castling_rights()
+        flags = (0 if color == 1 else 1) | sum(1 << (index + 1) for index, right in enumerate("KQkq") if right in castling)
+        en_passant = self.en_passant[0] * 8 + self.en_passant[1] if self.en_passant else NO_EN_PASSANT
+        return PACKED_POSITION.pack(squares, flags, en_passant, self.halfmove_clock, self.fullmove_number)
+
+    def from_bytes(self, data) -> int:
+        """
+        Sets up the board from a packed position.
+
+        Args:
+            data (bytes): A position packed by to_bytes.
+
+        Returns:
+            int: The color to move (1 for white, 0 for black).
+        """
+        squares, flags, en_passant, halfmove_clock, fullmove_number = PACKED_POSITION.unpack(data)
+        board = np.full((8, 8), None, dtype=object)
+        for index, byte in enumerate(squares):
+            for square, code in ((index * 2, byte & 0x0F), (index * 2 + 1, byte >> 4)):
+                if code:
+                    if code not in CODE_PIECES:
+                        raise ValueError(f"Invalid piece code {code} in packed position")
+                    piece_object, piece_color = CODE_PIECES[code]
+                    board[square // 8][square % 8] = piece_object(piece_color, (square // 8, square % 8))
+
+        castling = "".join(right for index, right in enumerate("KQkq") if flags & 1 << (index + 1))
+        en_passant = divmod(en_passant, 8) if en_passant != NO_EN_PASSANT else None
+        self.set_position(board, castling, en_passant, halfmove_clock, fullmove_number)
+        return 0 if flags & 1 else 1
+
+    def is_repetition(self, position_hash, count=1) -> bool:
+        """
+        Checks if a position already occurred since the last irreversible move.
+        Only every other ply is compared, since the same side must be to move.
+
+        Args:
+            position_hash (int): The hash of the position, from get_hash.
+            count (int): The number of earlier occurrences needed. 1 for the search, 2 for threefold repetition.
+
+        Returns:
+            bool: True if the position occurred at least count times before.
+        """
+        history = self.history
+        stop = max(len(history) - self.halfmove_clock, 0) - 1
+        for index in range(len(history) - 2, stop, -2):
+            if history[index] == position_hash:
+                count -= 1
+                if count == 0:
+                    return True
+        return False
+
+    def is_draw(self, color) -> bool:
+        """
+        Checks the game for a draw by threefold repetition or the fifty-move rule.
+
+        Args:
+            color (int): The color to move (1 for white, 0 for black).
+        """
+        return self.halfmove_clock >= 100 or self.is_repetition(self.get_hash(color=color), count=2)
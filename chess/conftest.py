@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other flat (from board import Board), as when run from this directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
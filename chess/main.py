@@ -1,15 +1,24 @@
-import numpy as np
+import argparse
+from contextlib import nullcontext
 from board import Board
-from ai.mini_max import minimax
+from ai.mini_max import search, load_table, save_table
+from ai.profiler import SearchProfiler, PROFILE_MODES
 from utils import valid_move_input
 
-def chess():
+SEARCH_DEPTH = 4 # Plies searched by the AI, including its own move
+TABLE_SNAPSHOT_PATH = "transposition.tt" # Transposition table kept between runs
+
+def chess(profile_mode=None):
     """
     This function initializes the chess board, prompts the players for moves,
     and updates the board accordingly until the game is finished or interrupted.
 
     NOTE: Moves are given in the format: 'a2 a4' (from a2 to a4)
+
+    Args:
+        profile_mode (str): "cprofile" or "sample" to profile each AI move. Defaults to the CHESS_PROFILE variable.
     """
+    profiler = SearchProfiler.from_environment(profile_mode)
 
     input("\nMoves are given in the format: 'a2 a4' (from a2 to a4)\nPress enter to continue...")
     global board
@@ -18,25 +27,19 @@ def chess():
     turn_color = 0 # Black
     AI_color = 1 # White
     player_checked = False
+    load_table(TABLE_SNAPSHOT_PATH) # Stale or corrupt snapshots are ignored
 
     try:
         print("\n\n")
         while True:
             if turn_color == AI_color:
-                best_evaluation = -np.inf
-                best_move = None
-
-                for move in board.get_moves(color=AI_color):
-                    c_board = board.simulate_move(move)
-                    evaluation = minimax(board_obj = board, board=c_board, depth=4, alpha=-np.inf, beta=np.inf, simulating_player=False)
-                    if evaluation > best_evaluation:
-                        best_evaluation = evaluation
-                        best_move = move
-                
+                with profiler.profile_move(board.fullmove_number) if profiler else nullcontext():
+                    _, best_move, _, _ = search(board, depth=SEARCH_DEPTH, color=AI_color)
+
                 piece = board.get_piece_from(best_move[0])
                 print(retrieved_string := f"\n\nAI Retrieved '{piece.__class__.__name__}' from {best_move[0]}")
                 print(f"{'─' * len(retrieved_string)}")
-                board.set_piece_at(pos=best_move[1], old_pos=best_move[0], piece=piece)
+                board.make_move(best_move)
                 
                 checked, color = board.is_in_check()
                 if checked:
@@ -46,6 +49,10 @@ def chess():
                 board.print_board()
                 turn_color = 0 # Switch turns to white
 
+                if board.is_draw(turn_color):
+                    input("Draw by repetition or the fifty-move rule!")
+                    break # End the game
+
             else:
                 position = valid_move_input(f"\n{['Black', 'White'][turn_color]}'s move: ").split()
 
@@ -61,10 +68,18 @@ def chess():
 
                     board.print_board()
                     turn_color = 1 # Switch turns to black
+
+                    if board.is_draw(turn_color):
+                        input("Draw by repetition or the fifty-move rule!")
+                        break # End the game
                     
     except KeyboardInterrupt:
         print("\nGoodbye!")
+    finally:
+        save_table(TABLE_SNAPSHOT_PATH)
 
 
 if __name__ == "__main__":
-    chess()
+    parser = argparse.ArgumentParser(description="Play chess against the AI.")
+    parser.add_argument("--profile", choices=PROFILE_MODES, help="profile each AI move (or set CHESS_PROFILE)")
+    chess(parser.parse_args().profile)
@@ -0,0 +1,76 @@
+"""
+Bounded LRU cache of generated move lists.
+"""
+from array import array
+from collections import OrderedDict
+
+from utils import pack_move, MOVE_TABLE
+
+
+class MoveCache:
+    """
+    Maps (position hash, color to move) to the packed moves generated for that position.
+
+    The position hash covers the pieces and castling rights, and a pawn's has_moved follows from
+    its rank, so every input to move generation is part of the key.
+
+    Attributes:
+        capacity (int): The maximum number of positions kept.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to generate moves.
+        evictions (int): Positions dropped to stay within capacity.
+    """
+
+    def __init__(self, capacity=100_000) -> None:
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, position_hash, color) -> list or None:
+        """
+        Returns the cached moves for a position, or None on a miss.
+        """
+        packed = self.entries.get((position_hash, color))
+        if packed is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end((position_hash, color))
+        return [MOVE_TABLE[code] for code in packed]
+
+    def peek(self, position_hash, color) -> list or None:
+        """
+        Returns the cached moves for a position like get, without counting a hit or miss or refreshing its recency.
+        """
+        packed = self.entries.get((position_hash, color))
+        return None if packed is None else [MOVE_TABLE[code] for code in packed]
+
+    def put(self, position_hash, color, moves) -> None:
+        """
+        Stores the moves for a position, evicting the least recently used positions when full.
+        """
+        if self.capacity <= 0:
+            return
+        self.entries[(position_hash, color)] = array("H", [pack_move(move) for move in moves])
+        self.entries.move_to_end((position_hash, color))
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits, self.misses, self.evictions = 0, 0, 0
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        Returns the size, capacity, hit, miss and eviction counts, and the hit rate.
+        """
+        return {"size": len(self.entries), "capacity": self.capacity, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hit_rate()}
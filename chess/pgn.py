@@ -0,0 +1,315 @@
+"""
+Streaming PGN reader and multi-process game ingestion.
+
+Games are read one at a time from the file, so archives of any size can be pushed
+through the Board without loading them into memory.
+
+Usage: python pgn.py games.pgn [--workers 4] [--chunk-size 256] [--queue-size 16]
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import re
+import threading
+import time
+from collections import Counter
+
+from board import Board
+from piece import Pawn, Rook, Knight, Bishop, Queen, King
+from utils import square_to_pos
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+TAG_PATTERN = re.compile(r'^\[(\w+)\s+"(.*)"\]$')
+COMMENT_PATTERN = re.compile(r"\{[^}]*\}")
+MOVE_NUMBER_PATTERN = re.compile(r"^\d+\.+")
+SAN_PATTERN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?[+#]?[!?]*$")
+RESULTS = {"1-0", "0-1", "1/2-1/2", "*"}
+RESULT_POLL_SECONDS = 1.0 # How often ingest checks that its workers are still alive
+SAN_PIECES = {"N": Knight, "B": Bishop, "R": Rook, "Q": Queen, "K": King}
+
+
+class PGNGame:
+    """
+    A single game record as read from a PGN file.
+
+    Attributes:
+        headers (dict): The tag pairs of the game (e.g., {"White": "...", "Result": "1-0"}).
+        movetext (str): The raw movetext, parsed lazily by moves().
+    """
+
+    def __init__(self, headers, movetext) -> None:
+        self.headers = headers
+        self.movetext = movetext
+
+    def moves(self) -> list:
+        """
+        Returns the SAN moves of the main line, without comments, variations or NAGs.
+        """
+        moves, depth = [], 0
+        text = COMMENT_PATTERN.sub(" ", self.movetext).replace("(", " ( ").replace(")", " ) ")
+        for token in text.split():
+            if token == "(":
+                depth += 1
+            elif token == ")":
+                depth -= 1
+            elif depth or token.startswith("$") or token in RESULTS:
+                continue
+            elif token := MOVE_NUMBER_PATTERN.sub("", token):
+                moves.append(token)
+        return moves
+
+
+def read_games(path):
+    """
+    Yields the games of a PGN file one at a time.
+
+    Args:
+        path (str): The path to the PGN file.
+
+    Yields:
+        PGNGame: The next game in the file.
+    """
+    headers, movetext = {}, []
+    with open(path, encoding="utf-8", errors="replace") as file:
+        for line in file:
+            line = line.split(";", 1)[0].strip() if "{" not in line else line.strip()
+            if line.startswith("[") and line.endswith("]"):
+                if movetext: # A new header block starts a new game
+                    yield PGNGame(headers, " ".join(movetext))
+                    headers, movetext = {}, []
+                if match := TAG_PATTERN.match(line):
+                    headers[match[1]] = match[2]
+            elif line and not line.startswith("%"):
+                movetext.append(line)
+                if line.split()[-1] in RESULTS: # The result token ends the game
+                    yield PGNGame(headers, " ".join(movetext))
+                    headers, movetext = {}, []
+
+    if headers or movetext:
+        yield PGNGame(headers, " ".join(movetext))
+
+
+def san_to_move(board, san, color) -> tuple:
+    """
+    Converts a SAN move to a board move, validated by the pieces on the board.
+
+    Args:
+        board (Board): The board the move is played on.
+        san (str): The move in Standard Algebraic Notation (e.g., "Nf3", "exd5", "O-O").
+        color (int): The color to move (1 for white, 0 for black).
+
+    Returns:
+        tuple: The move as ((row, col), (new_row, new_col)) and the promotion piece class, or None.
+
+    Raises:
+        ValueError: If the move is malformed, illegal or ambiguous.
+    """
+    king = board.kings[1 if color == 1 else 0]
+    castle = san.rstrip("+#!?").replace("0", "O")
+    if castle in ("O-O", "O-O-O"):
+        row, col = king.pos
+        new_pos = (row, col - 2 if castle == "O-O" else col + 2)
+        if not board.can_king_castle(new_pos, king):
+            raise ValueError(f"Illegal castle: '{san}'")
+        return (king.pos, new_pos), None
+
+    match = SAN_PATTERN.match(san)
+    if not match:
+        raise ValueError(f"Malformed SAN move: '{san}'")
+    piece_letter, from_file, from_rank, target, promotion = match.groups()
+    piece_type = SAN_PIECES[piece_letter] if piece_letter else Pawn
+    new_pos = square_to_pos(target)
+    pieces = board.white_pieces + [king] if color == 1 else board.black_pieces + [king]
+
+    candidates = []
+    for piece in pieces:
+        if type(piece) is not piece_type:
+            continue
+        if from_file and piece.pos[1] != square_to_pos(from_file + "1")[1]:
+            continue
+        if from_rank and piece.pos[0] != int(from_rank) - 1:
+            continue
+
+        if isinstance(piece, Pawn) and new_pos == board.en_passant:
+            step = 1 if piece.color == 1 else -1
+            valid = new_pos[0] == piece.pos[0] + step and abs(new_pos[1] - piece.pos[1]) == 1
+        else:
+            valid = piece.is_valid_move(new_pos, board.board) is True
+        if valid and not board.exposes_king((piece.pos, new_pos)):
+            candidates.append(piece)
+
+    if len(candidates) != 1:
+        raise ValueError(f"{'Ambiguous' if candidates else 'Illegal'} move: '{san}'")
+    return (candidates[0].pos, new_pos), SAN_PIECES[promotion] if promotion else None
+
+
+def replay_game(game) -> dict:
+    """
+    Plays every move of a game on a fresh Board.
+
+    Args:
+        game (PGNGame): The game to replay.
+
+    Returns:
+        dict: The number of plies played, the game result, and an error message if a move failed.
+    """
+    board, color, plies = Board(), 1, 0
+    try:
+        if "FEN" in game.headers:
+            color = board.load_fen(game.headers["FEN"])
+        for san in game.moves():
+            move, promotion = san_to_move(board, san, color)
+            board.make_move(move, promotion)
+            color = 1 - color
+            plies += 1
+    except ValueError as error:
+        return {"plies": plies, "result": game.headers.get("Result", "*"), "error": f"ply {plies + 1}: {error}"}
+    return {"plies": plies, "result": game.headers.get("Result", "*"), "error": None}
+
+
+def chunked(games, chunk_size):
+    """
+    Groups games into lists of chunk_size, so workers pay queue overhead per chunk, not per game.
+    """
+    chunk = []
+    for game in games:
+        chunk.append(game)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def handle_game(handler, game) -> dict:
+    """
+    Runs the handler on one game, turning any exception into an error summary so one bad game can't stop an ingest.
+    """
+    try:
+        return handler(game)
+    except Exception as error:
+        return {"plies": 0, "result": game.headers.get("Result", "*"), "error": f"{type(error).__name__}: {error}"}
+
+
+def _worker(tasks, results, handler):
+    """
+    Consumes chunks of games until it receives None, sending back one list of summaries per chunk.
+    The None sentinel is always sent, so the parent never waits on a worker that stopped.
+    """
+    try:
+        while (chunk := tasks.get()) is not None:
+            results.put([handle_game(handler, game) for game in chunk])
+    finally:
+        results.put(None)
+
+
+def _producer(path, tasks, chunk_size, workers):
+    """
+    Feeds chunks of games to the workers. Blocks while the task queue is full.
+    """
+    for chunk in chunked(read_games(path), chunk_size):
+        tasks.put(chunk)
+    for _ in range(workers):
+        tasks.put(None)
+
+
+def peak_memory() -> int or None:
+    """
+    Returns the peak resident memory of this process and its finished workers, in kilobytes.
+    """
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def ingest(path, workers=None, chunk_size=256, queue_size=16, handler=replay_game) -> dict:
+    """
+    Streams the games of a PGN file through a pool of worker processes.
+
+    Args:
+        path (str): The path to the PGN file.
+        workers (int): The number of worker processes. Defaults to the CPU count; 0 runs in this process.
+        chunk_size (int): The number of games sent to a worker at a time.
+        queue_size (int): The maximum number of chunks waiting in each queue.
+        handler (callable): A picklable function run on every PGNGame. Defaults to replay_game.
+
+    Returns:
+        dict: Game, ply and error counts, result counts, elapsed time, games per second and peak memory.
+    """
+    workers = mp.cpu_count() if workers is None else workers
+    stats = {"games": 0, "plies": 0, "errors": 0, "results": Counter()}
+
+    def tally(summaries):
+        for summary in summaries:
+            stats["games"] += 1
+            stats["plies"] += summary.get("plies", 0)
+            stats["errors"] += 1 if summary.get("error") else 0
+            stats["results"][summary.get("result", "*")] += 1
+
+    start = time.perf_counter()
+    if workers == 0:
+        for chunk in chunked(read_games(path), chunk_size):
+            tally([handle_game(handler, game) for game in chunk])
+    else:
+        tasks, results = mp.Queue(maxsize=queue_size), mp.Queue(maxsize=queue_size)
+        processes = [mp.Process(target=_worker, args=(tasks, results, handler), daemon=True) for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        # The producer runs in a thread so this process can keep draining results
+        producer = threading.Thread(target=_producer, args=(path, tasks, chunk_size, workers), daemon=True)
+        producer.start()
+
+        finished = 0
+        while finished < workers:
+            try:
+                summaries = results.get(timeout=RESULT_POLL_SECONDS)
+            except queue.Empty:
+                # A worker killed outright (e.g., out of memory) never sends its sentinel
+                crashed = [process.exitcode for process in processes if process.exitcode not in (None, 0)]
+                if crashed:
+                    for process in processes:
+                        process.terminate()
+                    raise RuntimeError(f"A PGN worker exited with code {crashed[0]}")
+                if not any(process.is_alive() for process in processes):
+                    break
+                continue
+            if summaries is None:
+                finished += 1
+            else:
+                tally(summaries)
+
+        producer.join()
+        for process in processes:
+            process.join()
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["games_per_second"] = stats["games"] / stats["elapsed"] if stats["elapsed"] else 0.0
+    stats["peak_memory_kb"] = peak_memory()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the games of a PGN file through the Board.")
+    parser.add_argument("path", help="PGN file to read")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count, 0: none)")
+    parser.add_argument("--chunk-size", type=int, default=256, help="games per chunk sent to a worker")
+    parser.add_argument("--queue-size", type=int, default=16, help="maximum chunks waiting in a queue")
+    args = parser.parse_args()
+
+    stats = ingest(args.path, args.workers, args.chunk_size, args.queue_size)
+    print(f"Games:       {stats['games']} ({stats['errors']} with errors)")
+    print(f"Plies:       {stats['plies']}")
+    print(f"Results:     {dict(stats['results'])}")
+    print(f"Elapsed:     {stats['elapsed']:.2f}s")
+    print(f"Throughput:  {stats['games_per_second']:.1f} games/s")
+    if stats["peak_memory_kb"] is not None:
+        print(f"Peak memory: {stats['peak_memory_kb'] / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
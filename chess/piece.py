@@ -91,7 +91,7 @@ class Pawn(Piece):
     def get_all_moves(self, board) -> list:
         moves = []
         row, col = self.pos
-        step = -1 if self.color == 1 else 1
+        step = 1 if self.color == 1 else -1
 
         # Forward movement
         if 0 <= row+step < 8 and board[row+step][col] is None:
@@ -357,11 +357,18 @@ class King(Piece):
             if 0 <= end_row < 8 and 0 <= end_col < 8:
                 end_pos = board[end_row][end_col]
                 if end_pos is None or end_pos.color != self.color:
-                    if not board.is_in_check([end_pos, self.color]):
-                        moves.append(((row, col), (end_row, end_col)))
+                    moves.append(((row, col), (end_row, end_col)))
 
-        # Castling
-        for direction in range[-2, 2]:
-            if board.can_king_castle((row, col+direction), self):
-                moves.append(((row,col), (row, col+direction)))
-        return moves
\ No newline at end of file
+        # Check and castling need the Board, so they are left to Board.can_king_castle
+        return moves
+
+
+# Material value of each piece, in pawns
+PIECE_VALUES = {
+    Pawn: 1,
+    Knight: 3,
+    Bishop: 3,
+    Rook: 5,
+    Queen: 9,
+    King: 100
+}
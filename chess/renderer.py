@@ -0,0 +1,109 @@
+"""
+Buffered terminal rendering for the Board.
+
+Each frame is built in one string and written with a single write. In diff mode the renderer
+owns the top of the screen and repaints only the squares that changed since the last frame.
+
+Diff mode is for full-screen spectator output, where nothing else is printed between frames: the
+repaints are addressed to fixed screen rows, so interleaved text (like main.py's prompts and move
+lines) would put them in the wrong place. Opt in with Board(renderer=BoardRenderer(diff=True)).
+"""
+import sys
+
+HEADER = "    a  b  c  d  e  f  g  h\n"
+LIGHT_SQUARE, DARK_SQUARE = "\033[48;5;208m", "\033[48;5;166m"
+UPPER_PIECE, LOWER_PIECE = "\033[97m", "\033[30m"
+RESET = "\033[0m"
+CLEAR_SCREEN = "\033[H\033[2J"
+SAVE_CURSOR, RESTORE_CURSOR = "\0337", "\0338"
+
+
+def render_square(piece, row, col) -> str:
+    """
+    Returns the escape codes and text of a single square, 3 columns wide.
+    """
+    background = LIGHT_SQUARE if (row + col) % 2 == 0 else DARK_SQUARE
+    if piece is None:
+        return background + "   " + RESET
+    return background + (UPPER_PIECE if piece.id.isupper() else LOWER_PIECE) + " " + piece.id + " " + RESET
+
+
+class BoardRenderer:
+    """
+    Draws a board to a terminal.
+
+    Attributes:
+        diff (bool): If True, clear the screen once and afterwards repaint only changed squares.
+            Only for output that prints nothing but frames; see the module docstring.
+        stream (file): Where frames are written. Defaults to sys.stdout at draw time.
+        last_squares (list): The 64 rendered squares of the last frame, used for diffs.
+    """
+
+    def __init__(self, diff=False, stream=None) -> None:
+        self.diff = diff
+        self.stream = stream
+        self.last_squares = None
+
+    def render(self, board) -> str:
+        """
+        Builds a full frame of the board.
+
+        Args:
+            board (np.ndarray): The 2D array of pieces to render.
+
+        Returns:
+            str: The frame, including the file labels above and below.
+        """
+        squares = [render_square(board[row][col], row, col) for row in range(8) for col in range(8)]
+        self.last_squares = squares
+        lines = [HEADER]
+        for row in range(8):
+            lines.append(f"{row + 1}  " + "".join(squares[row * 8:row * 8 + 8]) + RESET + "\n")
+        lines.append(HEADER)
+        return "".join(lines)
+
+    def render_diff(self, board) -> str:
+        """
+        Builds the cursor-addressed updates that turn the last frame into this one.
+        The frame is assumed to start on the first line of the screen.
+
+        Args:
+            board (np.ndarray): The 2D array of pieces to render.
+
+        Returns:
+            str: The updates, or an empty string if nothing changed.
+        """
+        updates = []
+        for row in range(8):
+            for col in range(8):
+                square = render_square(board[row][col], row, col)
+                if square != self.last_squares[row * 8 + col]:
+                    self.last_squares[row * 8 + col] = square
+                    updates.append(f"\033[{row + 2};{col * 3 + 4}H{square}")
+        if not updates:
+            return ""
+        return SAVE_CURSOR + "".join(updates) + RESTORE_CURSOR
+
+    def draw(self, board) -> None:
+        """
+        Writes the board to the stream in a single write.
+
+        Args:
+            board (np.ndarray): The 2D array of pieces to render.
+        """
+        if self.diff and self.last_squares is not None:
+            frame = self.render_diff(board)
+        elif self.diff:
+            frame = CLEAR_SCREEN + self.render(board)
+        else:
+            frame = self.render(board)
+
+        stream = self.stream or sys.stdout
+        stream.write(frame)
+        stream.flush()
+
+    def reset(self) -> None:
+        """
+        Forces the next draw to repaint the whole frame.
+        """
+        self.last_squares = None
@@ -0,0 +1,297 @@
+"""
+Asyncio game server: many concurrent games, one shared pool of engine workers.
+
+Each connection plays its own games over a line protocol (TCP or Unix socket):
+    NEW [white|black]      start a new game, playing the given color (default: black, like main.py)
+    MOVE <move>            play a move in long algebraic notation (e.g., e2e4, e7e8q); the engine replies
+    GO                     ask the engine to move when it is its turn
+    FEN                    show the current position
+    QUIT                   close the connection
+Replies are single lines: OK <fen>, ENGINE <move>, END <result>, BUSY <reason> or ERR <reason>.
+An ENGINE line is followed by an END line when the engine's move ends the game.
+
+Engine requests wait in a bounded queue ordered by the engine time each game has used,
+so no game can starve the others. When the queue is full, requests get BUSY and nothing is played.
+If a search fails, the reply is ERR engine failed and the engine's turn can be retried with GO.
+
+Usage: python server.py [--port 8765 | --unix /tmp/chess.sock] [--workers 4] [--max-pending 64]
+"""
+import argparse
+import asyncio
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from board import Board
+from piece import Rook, Knight, Bishop, Queen
+from ai.mini_max import search
+from ai.analysis import move_to_string
+from utils import square_to_pos
+
+PROMOTIONS = {"q": Queen, "r": Rook, "b": Bishop, "n": Knight}
+MOVES_TO_GO = 30 # Spread the remaining game budget over this many engine moves
+
+
+def engine_move(position, history, depth, time_limit) -> tuple:
+    """
+    Searches a position in a worker process.
+
+    Args:
+        position (bytes): The position to search, packed by Board.to_bytes.
+        history (list): Hashes of the game's earlier positions, for repetition detection.
+        depth (int): The maximum search depth in plies.
+        time_limit (float): Seconds to search for.
+
+    Returns:
+        tuple: The best move, or None if there are no moves.
+    """
+    board = Board()
+    color = board.from_bytes(position)
+    board.history = history
+    _, best_move, _, _ = search(board, depth=depth, color=color, time_limit=time_limit)
+    return best_move
+
+
+class EngineBusy(Exception):
+    """
+    Raised when the engine queue is full.
+    """
+
+
+class Game:
+    """
+    The state of one game on the server.
+
+    Attributes:
+        board (Board): The game's board.
+        turn (int): The color to move (1 for white, 0 for black).
+        player_color (int): The color the client plays.
+        engine_time (float): Engine seconds spent on this game so far.
+        time_budget (float): Engine seconds this game may use in total.
+    """
+
+    def __init__(self, player_color, time_budget) -> None:
+        self.board = Board()
+        self.turn = 1
+        self.player_color = player_color
+        self.engine_time = 0.0
+        self.time_budget = time_budget
+
+    def move_time(self, max_move_time, min_move_time=0.05) -> float:
+        """
+        Returns the time for the next engine move, from what is left of the game's budget.
+        """
+        remaining = max(self.time_budget - self.engine_time, 0.0)
+        return max(min(max_move_time, remaining / MOVES_TO_GO), min_move_time)
+
+    def play(self, move, promotion=None) -> None:
+        self.board.make_move(move, promotion)
+        self.turn = 1 - self.turn
+
+    def result(self) -> str or None:
+        """
+        Returns how the game ended, or None if it is still going.
+        """
+        if not self.board.get_legal_moves(self.turn):
+            king = self.board.kings[1 if self.turn == 1 else 0]
+            if self.board.is_square_attacked(king.pos, -king.color):
+                return f"checkmate, {['black', 'white'][1 - self.turn]} wins"
+            return "stalemate"
+        if self.board.is_draw(self.turn):
+            return "draw by repetition or the fifty-move rule"
+        return None
+
+
+class EnginePool:
+    """
+    Schedules engine searches from all games onto a shared process pool.
+
+    Attributes:
+        workers (int): The number of searches run at once.
+        queue (asyncio.PriorityQueue): Waiting requests, least engine time used first.
+    """
+
+    def __init__(self, workers, max_pending, depth, max_move_time) -> None:
+        self.workers = workers
+        self.depth = depth
+        self.max_move_time = max_move_time
+        self.queue = asyncio.PriorityQueue(maxsize=max_pending)
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.counter = itertools.count() # Breaks ties in arrival order
+        self.tasks = []
+
+    def start(self) -> None:
+        self.tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.executor.shutdown(cancel_futures=True)
+
+    async def request(self, game) -> tuple or None:
+        """
+        Queues a search of the game's position and waits for the engine's move.
+
+        Raises:
+            EngineBusy: If the queue is full.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((game.engine_time, next(self.counter), game, future))
+        except asyncio.QueueFull:
+            raise EngineBusy("engine queue is full, try again shortly")
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, game, future = await self.queue.get()
+            if future.cancelled(): # The client went away while waiting
+                continue
+            time_limit = game.move_time(self.max_move_time)
+            start = loop.time()
+            try:
+                move = await loop.run_in_executor(self.executor, engine_move, game.board.to_bytes(game.turn),
+                                                  list(game.board.history), self.depth, time_limit)
+            except Exception as error:
+                if not future.cancelled():
+                    future.set_exception(error)
+                continue
+            finally:
+                game.engine_time += loop.time() - start
+            if not future.cancelled():
+                future.set_result(move)
+
+
+def parse_move(game, text) -> tuple:
+    """
+    Converts a long algebraic move (e.g., "e2e4", "e7e8q") to a legal board move.
+
+    Raises:
+        ValueError: If the move is malformed or illegal.
+    """
+    text = text.lower()
+    if len(text) not in (4, 5) or text[0] not in "abcdefgh" or text[2] not in "abcdefgh" \
+            or text[1] not in "12345678" or text[3] not in "12345678" or text[4:] not in ("", *PROMOTIONS):
+        raise ValueError(f"malformed move '{text}'")
+    move = (square_to_pos(text[:2]), square_to_pos(text[2:4]))
+    if move not in game.board.get_legal_moves(game.turn):
+        raise ValueError(f"illegal move '{text}'")
+    return move, PROMOTIONS.get(text[4:])
+
+
+class ChessServer:
+    """
+    Serves games over a line protocol, sharing one EnginePool between all connections.
+    """
+
+    def __init__(self, pool, time_budget) -> None:
+        self.pool = pool
+        self.time_budget = time_budget
+        self.games = 0
+
+    async def engine_turn(self, game) -> str:
+        move = await self.pool.request(game)
+        legal_moves = game.board.get_legal_moves(game.turn)
+        if move not in legal_moves: # The search is pseudo-legal, so fall back to any legal move
+            move = legal_moves[0]
+        game.play(move)
+        reply = f"ENGINE {move_to_string(move)}"
+        if result := game.result():
+            reply += f"\nEND {result}"
+        return reply
+
+    async def handle_command(self, game, command, args) -> tuple:
+        """
+        Runs one command, returning the (possibly new) game and the reply.
+        """
+        if command == "NEW":
+            if args and args[0].lower() not in ("white", "black"):
+                return game, "ERR expected NEW white or NEW black"
+            game = Game(1 if args and args[0].lower() == "white" else 0, self.time_budget)
+            self.games += 1
+            return game, f"OK {game.board.get_fen(game.turn)}"
+        if game is None:
+            return None, "ERR no game, send NEW first"
+        if command == "FEN":
+            return game, f"OK {game.board.get_fen(game.turn)}"
+        if game.result():
+            return game, f"END {game.result()}"
+
+        if command == "MOVE":
+            if game.turn != game.player_color:
+                return game, "ERR not your turn, send GO"
+            if self.pool.queue.full(): # Refuse before playing, so the game never waits half a turn
+                return game, "BUSY engine queue is full, try again shortly"
+            try:
+                move, promotion = parse_move(game, args[0] if args else "")
+            except ValueError as error:
+                return game, f"ERR {error}"
+            game.play(move, promotion)
+            if result := game.result():
+                return game, f"END {result}"
+            return game, await self.engine_turn(game)
+
+        if command == "GO":
+            if game.turn == game.player_color:
+                return game, "ERR it is your turn"
+            return game, await self.engine_turn(game)
+        return game, f"ERR unknown command '{command}'"
+
+    async def handle_client(self, reader, writer):
+        game = None
+        try:
+            while line := await reader.readline():
+                command, *args = line.decode(errors="replace").split() or [""]
+                if command.upper() == "QUIT":
+                    break
+                try:
+                    game, reply = await self.handle_command(game, command.upper(), args)
+                except EngineBusy as error:
+                    reply = f"BUSY {error}"
+                except Exception as error: # A failed search ends the request, not the connection
+                    reply = f"ERR engine failed: {type(error).__name__}: {error}"
+                writer.write(reply.encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(args):
+    pool = EnginePool(args.workers, args.max_pending, args.depth, args.move_time)
+    pool.start()
+    server = ChessServer(pool, args.game_time)
+    if args.unix:
+        listener = await asyncio.start_unix_server(server.handle_client, path=args.unix)
+    else:
+        listener = await asyncio.start_server(server.handle_client, host=args.host, port=args.port)
+
+    print(f"Serving on {args.unix or f'{args.host}:{args.port}'} with {args.workers} engine workers")
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await pool.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host many chess games against a shared engine pool.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="serve on a Unix socket at this path instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="engine worker processes")
+    parser.add_argument("--max-pending", type=int, default=64, help="engine requests allowed to wait")
+    parser.add_argument("--depth", type=int, default=4, help="maximum engine search depth")
+    parser.add_argument("--move-time", type=float, default=2.0, help="maximum engine seconds per move")
+    parser.add_argument("--game-time", type=float, default=120.0, help="engine seconds per game")
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        print("\nGoodbye!")
+
+
+if __name__ == "__main__":
+    main()
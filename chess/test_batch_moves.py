@@ -0,0 +1,51 @@
+"""
+Checks batch_moves against the Board's own move generation on random games.
+"""
+import random
+
+import pytest
+
+from bench import BENCH_POSITIONS
+from board import Board, position_array
+from batch_moves import generate_records, move_counts, move_list
+
+
+def random_positions(games=20, max_plies=60, seed=0) -> list:
+    """
+    Returns (board, color) pairs visited by random games, copied after every ply.
+    """
+    rng, positions = random.Random(seed), []
+    for _ in range(games):
+        board, color = Board(), 1
+        for _ in range(rng.randint(0, max_plies)):
+            moves = board.get_legal_moves(color)
+            if not moves:
+                break
+            board.make_move(rng.choice(moves))
+            color = 1 - color
+            copy = Board()
+            copy.load_fen(board.get_fen(color))
+            positions.append((copy, color))
+    return positions
+
+
+def fen_positions() -> list:
+    positions = []
+    for fen in BENCH_POSITIONS.values():
+        board = Board()
+        positions.append((board, board.load_fen(fen)))
+    return positions
+
+
+@pytest.mark.parametrize("positions", [random_positions(), fen_positions()], ids=["random_games", "bench"])
+def test_matches_board_moves(positions):
+    records = position_array(b"".join(board.to_bytes(color) for board, color in positions))
+    targets = generate_records(records)
+    counts = move_counts(targets)
+
+    for index, (board, color) in enumerate(positions):
+        batch = move_list(targets[index])
+        assert counts[index] == len(batch)
+        assert set(board.get_moves(color)) <= set(batch), board.get_fen(color)
+        legal = {move for move in batch if not board.exposes_king(move)}
+        assert legal == set(board.get_legal_moves(color)), board.get_fen(color)
@@ -0,0 +1,257 @@
+"""
+Texel tuning of the material values and piece-square tables.
+
+Fits the engine's evaluation (material plus piece-square tables, as in ai/mini_max.evaluate) to labelled
+positions by minimizing the mean squared error between each label and sigmoid(k * evaluation), with
+batched gradient descent in NumPy. Tuning starts from the engine's current values, and the engine loads
+the tables it writes (tuned_tables.py, next to main.py) in place of ai/piece_square_tables.py.
+Positions are turned into fixed-width feature matrices once, so each step over millions of
+positions is a handful of array operations.
+
+Dataset lines hold a FEN and a label: a game result (1-0, 0-1, 1/2-1/2) or white's expected score
+between 0 and 1, e.g.
+    rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1 "1/2-1/2"
+An .npz dataset with "positions" (records packed by Board.to_bytes) and "labels" arrays loads without parsing.
+
+Usage: python tune.py positions.txt [--epochs 100] [--batch-size 16384] [--output tuned_tables.py]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from board import PIECE_CODES, POSITION_DTYPE, position_squares
+from piece import Pawn, Knight, Bishop, Rook, Queen, King
+from ai.mini_max import EVALUATION_VALUES, SQUARE_TABLES, PST_SCALE
+
+PIECE_TYPES = [Pawn, Knight, Bishop, Rook, Queen, King] # In piece code order
+RESULT_LABELS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+PST_OFFSET = len(PIECE_TYPES) # Material parameters come first, then one 64-square table per piece type
+PARAMETER_COUNT = PST_OFFSET + 64 * len(PIECE_TYPES)
+PADDING = PARAMETER_COUNT # Feature index of empty slots; its parameter is always 0
+
+# Table index (row 0 is the eighth rank, files a to h) of each board square, for white and black pieces.
+# Board columns are mirrored (king on column 3), and black reads the tables flipped vertically.
+_rows, _cols = np.divmod(np.arange(64), 8)
+TABLE_SQUARES = np.stack([(7 - _rows) * 8 + (7 - _cols), _rows * 8 + (7 - _cols)])
+
+
+def fen_squares(placement) -> list:
+    """
+    Returns the piece codes of a FEN placement field, indexed by row * 8 + col like Board.to_bytes.
+    """
+    squares, row = [0] * 64, 7
+    for rank in placement.split("/"):
+        col = 7
+        for char in rank:
+            if char.isdigit():
+                col -= int(char)
+            else:
+                squares[row * 8 + col] = PIECE_CODES[char]
+                col -= 1
+        row -= 1
+    return squares
+
+
+def parse_label(text) -> float:
+    text = text.strip('"[];')
+    return RESULT_LABELS[text] if text in RESULT_LABELS else float(text)
+
+
+def load_dataset(path) -> tuple:
+    """
+    Loads labelled positions from a text or .npz dataset.
+
+    Returns:
+        tuple: An (N, 64) array of piece codes and an (N,) array of labels (white's score, 0 to 1).
+    """
+    if path.endswith(".npz"):
+        data = np.load(path)
+        return position_squares(data["positions"].view(POSITION_DTYPE).ravel()), data["labels"].astype(np.float32)
+
+    squares, labels = [], []
+    with open(path) as file:
+        for line_number, line in enumerate(file, 1):
+            fields = line.replace(";", " ").split()
+            if not fields:
+                continue
+            try:
+                labels.append(parse_label(fields[-1]))
+                squares.append(fen_squares(fields[0]))
+            except (KeyError, ValueError, IndexError):
+                raise ValueError(f"{path}:{line_number}: expected a FEN and a label, got '{line.strip()}'")
+    return np.array(squares, dtype=np.uint8).reshape(-1, 64), np.array(labels, dtype=np.float32)
+
+
+def build_features(squares) -> tuple:
+    """
+    Turns piece codes into fixed-width feature matrices: each piece adds its material parameter and
+    its piece-square parameter, +1 for white and -1 for black.
+
+    Args:
+        squares (np.ndarray): An (N, 64) array of piece codes.
+
+    Returns:
+        tuple: An (N, 64) int16 array of parameter indices and an (N, 64) int8 array of signs.
+    """
+    # Move the (at most 32) occupied squares of each position to the front
+    order = np.argsort(squares == 0, axis=1, kind="stable")[:, :32]
+    codes = np.take_along_axis(squares, order, axis=1)
+    occupied = codes != 0
+    is_black = codes >= 8
+    piece_type = (codes & 7).astype(np.int16) - 1
+
+    table_square = TABLE_SQUARES[is_black.astype(np.intp), order]
+    material = np.where(occupied, piece_type, PADDING)
+    table = np.where(occupied, PST_OFFSET + piece_type * 64 + table_square, PADDING)
+    signs = np.where(occupied, np.where(is_black, -1, 1), 0).astype(np.int8)
+    return np.concatenate([material, table], axis=1).astype(np.int16), np.concatenate([signs, signs], axis=1)
+
+
+def initial_parameters() -> np.ndarray:
+    """
+    Returns the engine's current piece values and tables as a parameter vector (plus the padding entry).
+    """
+    parameters = np.zeros(PARAMETER_COUNT + 1)
+    for index, piece_type in enumerate(PIECE_TYPES):
+        parameters[index] = EVALUATION_VALUES[piece_type]
+        parameters[PST_OFFSET + index * 64:PST_OFFSET + (index + 1) * 64] = np.ravel(SQUARE_TABLES[piece_type])
+    return parameters
+
+
+def feature_scales() -> np.ndarray:
+    scales = np.full(PARAMETER_COUNT + 1, PST_SCALE)
+    scales[:PST_OFFSET] = 1.0
+    scales[PADDING] = 0.0
+    return scales
+
+
+def evaluate(parameters, indices, signs) -> np.ndarray:
+    """
+    Evaluates many positions at once, in pawns from white's point of view.
+    """
+    return (signs * (parameters * feature_scales()).astype(np.float32)[indices]).sum(axis=1)
+
+
+def sigmoid(k, evaluation) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-k * evaluation))
+
+
+def mean_error(k, evaluation, labels) -> float:
+    return float(np.mean((labels - sigmoid(k, evaluation)) ** 2))
+
+
+def fit_k(evaluation, labels) -> float:
+    """
+    Finds the sigmoid scale that best maps the current evaluation to the labels.
+    """
+    candidates = np.linspace(0.05, 3.0, 60)
+    k = candidates[np.argmin([mean_error(k, evaluation, labels) for k in candidates])]
+    for step in (0.025, 0.005, 0.001): # Refine around the best candidate
+        candidates = k + step * np.arange(-4, 5)
+        k = candidates[np.argmin([mean_error(k, evaluation, labels) for k in candidates])]
+    return float(k)
+
+
+def tune(indices, signs, labels, k, epochs=100, batch_size=16384, learning_rate=0.01, seed=0, on_epoch=None) -> np.ndarray:
+    """
+    Fits the parameters with Adam over shuffled mini-batches.
+
+    Args:
+        indices (np.ndarray): Parameter indices, from build_features.
+        signs (np.ndarray): Feature signs, from build_features.
+        labels (np.ndarray): White's score in each position, 0 to 1.
+        k (float): The sigmoid scale, from fit_k.
+        epochs (int): Passes over the dataset.
+        batch_size (int): Positions per gradient step.
+        learning_rate (float): Adam's step size, in parameter units.
+        seed (int): Seeds the shuffling.
+        on_epoch (callable): Called with (epoch, parameters) after each epoch.
+
+    Returns:
+        np.ndarray: The tuned parameters.
+    """
+    parameters = initial_parameters()
+    scales = feature_scales()
+    frozen = np.zeros(PARAMETER_COUNT + 1, dtype=bool)
+    frozen[[PIECE_TYPES.index(King), PADDING]] = True # Both sides always have a king, so its value never matters
+
+    first_moment, second_moment = np.zeros_like(parameters), np.zeros_like(parameters)
+    beta1, beta2, epsilon, step = 0.9, 0.999, 1e-8, 0
+    random = np.random.default_rng(seed)
+
+    for epoch in range(1, epochs + 1):
+        for batch in np.array_split(random.permutation(len(labels)), max(len(labels) // batch_size, 1)):
+            batch_indices, batch_signs = indices[batch], signs[batch]
+            predicted = sigmoid(k, evaluate(parameters, batch_indices, batch_signs))
+            # d(error)/d(evaluation) per position, spread onto the parameters each position uses
+            error_gradient = -2.0 * (labels[batch] - predicted) * predicted * (1.0 - predicted) * k / len(batch)
+            gradient = np.bincount(batch_indices.ravel(), weights=(batch_signs * error_gradient[:, None]).ravel(),
+                                   minlength=PARAMETER_COUNT + 1) * scales
+            gradient[frozen] = 0.0
+
+            step += 1
+            first_moment = beta1 * first_moment + (1 - beta1) * gradient
+            second_moment = beta2 * second_moment + (1 - beta2) * gradient ** 2
+            corrected = first_moment / (1 - beta1 ** step)
+            parameters -= learning_rate * corrected / (np.sqrt(second_moment / (1 - beta2 ** step)) + epsilon)
+        if on_epoch:
+            on_epoch(epoch, parameters)
+    return parameters
+
+
+def write_tables(path, parameters, positions, error) -> None:
+    """
+    Writes the tuned values as a module in the format of ai/piece_square_tables.py.
+    """
+    lines = ["from piece import *", "",
+             f"# Tuned by tune.py on {positions} positions (mean squared error {error:.6f})",
+             "# Material values are in pawns, tables in tenths of a pawn valued for WHITE",
+             "PIECE_VALUES = {"]
+    lines += [f"    {piece_type.__name__}: {parameters[index]:.3f}," for index, piece_type in enumerate(PIECE_TYPES)]
+    lines += ["}", "", "squareTables = {"]
+    for index, piece_type in enumerate(PIECE_TYPES):
+        table = parameters[PST_OFFSET + index * 64:PST_OFFSET + (index + 1) * 64].reshape(8, 8)
+        prefix = f"    {piece_type.__name__}: ["
+        rows = [", ".join(f"{value:.2f}" for value in row) for row in table]
+        lines.append(prefix + f"[{rows[0]}],")
+        lines += [" " * len(prefix) + f"[{row}]," for row in rows[1:-1]]
+        lines.append(" " * len(prefix) + f"[{rows[-1]}]],")
+        lines.append("")
+    lines[-1] = "}"
+    with open(path, "w") as file:
+        file.write("\n".join(lines) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune the piece values and piece-square tables on labelled positions.")
+    parser.add_argument("path", help="dataset: FEN and label per line, or an .npz of packed positions and labels")
+    parser.add_argument("--output", default="tuned_tables.py", help="module to write the tuned tables to")
+    parser.add_argument("--epochs", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=16384, help="positions per gradient step")
+    parser.add_argument("--learning-rate", type=float, default=0.01)
+    parser.add_argument("--k", type=float, help="sigmoid scale (default: fitted to the starting evaluation)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    squares, labels = load_dataset(args.path)
+    indices, signs = build_features(squares)
+    print(f"Loaded {len(labels)} positions in {time.perf_counter() - start:.1f}s")
+
+    evaluation = evaluate(initial_parameters(), indices, signs)
+    k = args.k or fit_k(evaluation, labels)
+    print(f"k = {k:.3f}, starting error {mean_error(k, evaluation, labels):.6f}")
+
+    def report(epoch, parameters):
+        if epoch % 10 == 0 or epoch == args.epochs:
+            error = mean_error(k, evaluate(parameters, indices, signs), labels)
+            print(f"epoch {epoch:>4}  error {error:.6f}  ({time.perf_counter() - start:.1f}s)")
+
+    parameters = tune(indices, signs, labels, k, args.epochs, args.batch_size, args.learning_rate, on_epoch=report)
+    error = mean_error(k, evaluate(parameters, indices, signs), labels)
+    write_tables(args.output, parameters, len(labels), error)
+    print(f"Tables written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -12,4 +12,43 @@ def valid_move_input(prompt):
                     if response[2] == " ":
                         return response
 
-        print(f"Invalid input ('{response}')", end="\n\n")
\ No newline at end of file
+        print(f"Invalid input ('{response}')", end="\n\n")
+
+
+def square_to_pos(square):
+    """
+    Converts a standard algebraic square (e.g., "e4") to a board position.
+    The board keeps the king on column 3, so files are mirrored (h-file is column 0).
+    """
+    return (int(square[1]) - 1, 7 - (ord(square[0]) - 97))
+
+
+def pos_to_square(pos):
+    """
+    Converts a board position to a standard algebraic square (e.g., "e4").
+    """
+    return f"{chr(97 + 7 - pos[1])}{pos[0] + 1}"
+
+
+NO_MOVE = 0xFFFF
+
+
+def pack_move(move):
+    """
+    Packs a move ((row, col), (new_row, new_col)) into a 12-bit integer, from square * 64 + to square.
+    """
+    if move is None:
+        return NO_MOVE
+    (row, col), (new_row, new_col) = move
+    return (row * 8 + col) * 64 + new_row * 8 + new_col
+
+
+# Every packed move, unpacked once, so unpacking is a list lookup
+MOVE_TABLE = [(divmod(code // 64, 8), divmod(code % 64, 8)) for code in range(4096)]
+
+
+def unpack_move(code):
+    """
+    Unpacks a move packed by pack_move.
+    """
+    return None if code == NO_MOVE else MOVE_TABLE[code]